@@ -54,8 +54,10 @@ def main():
     print("체스보드를 다양한 각도와 위치에서 촬영합니다.")
     print()
 
-    images_left, images_right = calibrator.capture_calibration_images(
-        cap_left, cap_right, num_images=20, display=True
+    images_left, images_right, corners_left, corners_right = (
+        calibrator.capture_calibration_images(
+            cap_left, cap_right, num_images=20, display=True
+        )
     )
 
     # 카메라 해제
@@ -79,7 +81,9 @@ def main():
     print("(시간이 걸릴 수 있습니다)")
     print()
 
-    success = calibrator.calibrate_cameras(images_left, images_right)
+    success = calibrator.calibrate_cameras(
+        images_left, images_right, corners_left, corners_right
+    )
 
     if success:
         print()
@@ -93,7 +97,7 @@ def main():
         print()
         if calibrator.save_calibration():
             print("✓ 캘리브레이션 데이터가 저장되었습니다.")
-            print(f"  저장 위치: data/stereo_calibration.pkl")
+            print(f"  저장 위치: data/stereo_calibration.npz")
         else:
             print("✗ 캘리브레이션 데이터 저장 실패")
     else:
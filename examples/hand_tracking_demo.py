@@ -183,14 +183,11 @@ def main():
                     handedness = hand_data["handedness"]
 
                     # 손가락이 펴져있는지 확인
-                    fingers = ["THUMB", "INDEX", "MIDDLE", "RING", "PINKY"]
-                    extended = [
-                        tracker.is_finger_extended(hand_data, f) for f in fingers
-                    ]
+                    extended = tracker.is_fingers_extended(hand_data)
 
                     print(f"{handedness} Hand - Fingers: ", end="")
-                    for i, finger in enumerate(fingers):
-                        if extended[i]:
+                    for finger, is_extended in extended.items():
+                        if is_extended:
                             print(f"{finger}✓ ", end="")
                         else:
                             print(f"{finger}✗ ", end="")
@@ -10,10 +10,12 @@
 """
 
 import sys
+import colorsys
 import logging
 import time
 import yaml
 import os
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 import cv2
@@ -41,6 +43,65 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# 방정식 샘플 캐시: (키, x_min, x_max, num_points) -> (N, 2) 읽기 전용 (x, y) 배열
+# 음성 명령으로 같은 방정식이 반복해서 추가되는 경우 재계산을 생략
+GRAPH_SAMPLE_CACHE_SIZE = 64
+_graph_sample_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+
+
+def _sample_equation(equation, x_min: float, x_max: float, num_points: int,
+                     cache_key: Optional[str] = None) -> np.ndarray:
+    """
+    y = f(x)를 x 범위에서 샘플링합니다. cache_key가 주어지면 LRU 캐시를 사용합니다.
+    
+    Returns:
+        (N, 2) float32 읽기 전용 배열 [(x, y), ...] (계산 실패한 점 제외)
+    """
+    key = None
+    if cache_key is not None:
+        key = (cache_key, float(x_min), float(x_max), int(num_points))
+        cached = _graph_sample_cache.get(key)
+        if cached is not None:
+            _graph_sample_cache.move_to_end(key)
+            return cached
+    
+    x_values = np.linspace(x_min, x_max, num_points)
+    
+    # 정의역 밖의 값(log 음수, 0으로 나누기 등)은 예외 대신 nan/inf로 받아서 걸러냄
+    with np.errstate(all="ignore"):
+        try:
+            # y = f(x)를 배열 전체에 대해 한 번에 계산
+            y_values = np.broadcast_to(
+                np.asarray(equation(x_values), dtype=np.float64), x_values.shape
+            )
+        except (ValueError, ArithmeticError, TypeError):
+            # 배열 입력을 지원하지 않는 함수는 점별로 계산
+            y_values = np.array(
+                [_evaluate_point(equation, x) for x in x_values], dtype=np.float64
+            )
+    
+    valid = np.isfinite(y_values)
+    samples = np.empty((int(valid.sum()), 2), dtype=np.float32)
+    samples[:, 0] = x_values[valid]
+    samples[:, 1] = y_values[valid]
+    samples.setflags(write=False)
+    
+    if key is not None:
+        _graph_sample_cache[key] = samples
+        if len(_graph_sample_cache) > GRAPH_SAMPLE_CACHE_SIZE:
+            _graph_sample_cache.popitem(last=False)
+    
+    return samples
+
+
+def _evaluate_point(equation, x: float) -> float:
+    """단일 점에서 y = f(x)를 계산합니다. 계산 오류 시 nan을 반환합니다."""
+    try:
+        return float(equation(x))
+    except (ValueError, ArithmeticError, TypeError):
+        return float("nan")
+
+
 class CoordinateSystem:
     """
     카메라 인식 범위 좌표계 관리 클래스
@@ -106,46 +167,8 @@ class VirtualGraph:
         self.equation_str = ""
         self.visible = True
         
-        if equation is not None and x_range is not None:
-            # 수학 방정식으로부터 그래프 점 생성
-            self.graph_points = self._generate_graph_from_equation(
-                equation, x_range, num_points
-            )
-        else:
-            # 기본 그래프 (없음)
-            self.graph_points = np.array([], dtype=np.float32).reshape(0, 3)
-    
-    def _generate_graph_from_equation(self, equation, x_range, num_points):
-        """
-        수학 방정식으로부터 3D 그래프 점들을 생성
-        
-        Args:
-            equation: y = f(x) 함수
-            x_range: (x_min, x_max)
-            num_points: 생성할 점의 개수
-            
-        Returns:
-            numpy array of shape (num_points, 3) with (x, y, z) coordinates
-        """
-        x_min, x_max = x_range
-        x_values = np.linspace(x_min, x_max, num_points)
-        
-        graph_points = []
-        for x in x_values:
-            try:
-                # y = f(x) 계산
-                y_value = equation(x)
-                
-                # 3D 좌표 생성: (x, table_height, z)
-                # z 좌표는 y_value를 z_offset에 더해서 표현
-                z = self.z_offset + y_value
-                
-                graph_points.append([x, self.table_height, z])
-            except:
-                # 계산 오류 시 스킵
-                continue
-        
-        return np.array(graph_points, dtype=np.float32)
+        # draw_info용 라벨 문자열 캐시 (이름/방정식/가시성이 바뀔 때만 다시 만듦)
+        self._label_text: Optional[str] = None
         
         if equation is not None and x_range is not None:
             # 수학 방정식으로부터 그래프 점 생성
@@ -156,7 +179,8 @@ class VirtualGraph:
             # 기본 그래프 (없음)
             self.graph_points = np.array([], dtype=np.float32).reshape(0, 3)
     
-    def _generate_graph_from_equation(self, equation, x_range, num_points):
+    def _generate_graph_from_equation(self, equation, x_range, num_points,
+                                      cache_key: Optional[str] = None):
         """
         수학 방정식으로부터 3D 그래프 점들을 생성
         
@@ -164,31 +188,25 @@ class VirtualGraph:
             equation: y = f(x) 함수
             x_range: (x_min, x_max)
             num_points: 생성할 점의 개수
+            cache_key: 샘플 캐시 키 (None이면 캐시 사용 안 함)
             
         Returns:
             numpy array of shape (num_points, 3) with (x, y, z) coordinates
         """
         x_min, x_max = x_range
-        x_values = np.linspace(x_min, x_max, num_points)
+        samples = _sample_equation(equation, x_min, x_max, num_points, cache_key)
         
-        graph_points = []
-        for x in x_values:
-            try:
-                # y = f(x) 계산
-                y_value = equation(x)
-                
-                # 3D 좌표 생성: (x, table_height, z)
-                # z 좌표는 y_value를 z_offset에 더해서 표현
-                z = self.z_offset + y_value
-                
-                graph_points.append([x, self.table_height, z])
-            except:
-                # 계산 오류 시 스킵
-                continue
+        # 3D 좌표 생성: (x, table_height, z)
+        # z 좌표는 y_value를 z_offset에 더해서 표현
+        graph_points = np.empty((len(samples), 3), dtype=np.float32)
+        graph_points[:, 0] = samples[:, 0]
+        graph_points[:, 1] = self.table_height
+        graph_points[:, 2] = self.z_offset + samples[:, 1]
         
-        return np.array(graph_points, dtype=np.float32)
+        return graph_points
     
-    def set_equation(self, equation, x_range, num_points=100, equation_str=""):
+    def set_equation(self, equation, x_range, num_points=100, equation_str="",
+                     cache_key: Optional[str] = None):
         """
         새로운 방정식으로 그래프 업데이트
         
@@ -197,15 +215,30 @@ class VirtualGraph:
             x_range: (x_min, x_max)
             num_points: 생성할 점의 개수
             equation_str: 방정식 문자열 (표시용)
+            cache_key: 샘플 캐시 키 (lambda 문자열 등, None이면 캐시 사용 안 함)
         """
         self.graph_points = self._generate_graph_from_equation(
-            equation, x_range, num_points
+            equation, x_range, num_points, cache_key
         )
         self.equation_str = equation_str
+        self._label_text = None
     
     def toggle_visibility(self):
         """가시성 토글"""
         self.visible = not self.visible
+        self._label_text = None
+    
+    def get_label_text(self) -> str:
+        """
+        그래프 목록에 표시할 라벨 문자열을 반환합니다.
+        
+        Returns:
+            "  ● 이름: 방정식" 형식 문자열 (50자 제한)
+        """
+        if self._label_text is None:
+            status_mark = "●" if self.visible else "○"
+            self._label_text = f"  {status_mark} {self.name}: {self.equation_str}"[:50]  # 길이 제한
+        return self._label_text
 
 
 class MultiGraphManager:
@@ -223,7 +256,8 @@ class MultiGraphManager:
         self.active_graph_index = 0
     
     def add_graph(self, name: str, equation, equation_str: str, 
-                  color: Optional[Tuple[int, int, int]] = None) -> VirtualGraph:
+                  color: Optional[Tuple[int, int, int]] = None,
+                  lambda_str: Optional[str] = None) -> VirtualGraph:
         """
         그래프 추가
         
@@ -232,6 +266,7 @@ class MultiGraphManager:
             equation: y = f(x) 함수
             equation_str: 방정식 문자열
             color: RGB 색상 (None이면 자동 생성)
+            lambda_str: 함수의 lambda 문자열 (샘플 캐시 키로 사용)
         """
         if color is None:
             # 무지개 색상 자동 생성
@@ -245,7 +280,8 @@ class MultiGraphManager:
         )
         
         x_min, x_max, z_min, z_max = self.coordinate_system.get_range()
-        graph.set_equation(equation, (x_min, x_max), equation_str=equation_str)
+        graph.set_equation(equation, (x_min, x_max), equation_str=equation_str,
+                           cache_key=lambda_str)
         
         self.graphs.append(graph)
         logger.info(f"✓ 그래프 추가: {name} ({len(graph.graph_points)} 점)")
@@ -298,7 +334,6 @@ class MultiGraphManager:
     
     def _hsv_to_rgb(self, h: float, s: float, v: float) -> Tuple[int, int, int]:
         """HSV를 RGB로 변환"""
-        import colorsys
         r, g, b = colorsys.hsv_to_rgb(h / 360, s, v)
         return (int(r * 255), int(g * 255), int(b * 255))
 
@@ -382,6 +417,27 @@ def load_config(config_path="config/config.yaml"):
         return {}
 
 
+def configure_opencv():
+    """
+    OpenCV SIMD 최적화와 내부 스레드 수를 설정합니다 (프로세스 전체에 적용).
+
+    기본 스레드 수는 CPU 코어 수이며, 진동모터 스레드 등에 코어를 남기려면
+    STEREO_THREADS 환경 변수로 줄일 수 있습니다.
+    """
+    default_threads = os.cpu_count() or 1
+    threads = os.environ.get("STEREO_THREADS", str(default_threads))
+    try:
+        num_threads = int(threads)
+        if num_threads < 1:
+            raise ValueError
+    except ValueError:
+        logger.warning(f"잘못된 STEREO_THREADS 값: {threads!r} (기본값 {default_threads} 사용)")
+        num_threads = default_threads
+
+    cv2.setUseOptimized(True)
+    cv2.setNumThreads(num_threads)
+
+
 def draw_info(frame, hands_3d, graph_manager: MultiGraphManager, 
               coord_system: CoordinateSystem, motor_states: Dict[str, float], 
               fps=0, collision_info: Optional[Tuple] = None):
@@ -424,12 +480,10 @@ def draw_info(frame, hands_3d, graph_manager: MultiGraphManager,
     )
     y_offset += 20
     
-    for i, graph in enumerate(graph_manager.graphs):
-        status_mark = "●" if graph.visible else "○"
-        text = f"  {status_mark} {graph.name}: {graph.equation_str}"
+    for graph in graph_manager.graphs:
         cv2.putText(
             frame,
-            text[:50],  # 길이 제한
+            graph.get_label_text(),
             (10, y_offset),
             cv2.FONT_HERSHEY_SIMPLEX,
             0.4,
@@ -654,6 +708,9 @@ def main():
     # 설정 로드
     config = load_config()
 
+    # OpenCV 최적화/스레드 설정
+    configure_opencv()
+
     # Gemini API 키 로드
     gemini_api_key = os.environ.get('GEMINI_API_KEY', config.get('gemini', {}).get('api_key', None))
     
@@ -719,6 +776,7 @@ def main():
         max_num_hands=1,  # 한 개의 손만 추적
         min_detection_confidence=hand_config.get("min_detection_confidence", 0.5),
         min_tracking_confidence=hand_config.get("min_tracking_confidence", 0.5),
+        use_opencl=hand_config.get("use_opencl", False),
     )
     logger.info("✓ 3D 손 추적기 초기화 완료 (단일 손 모드)")
 
@@ -762,7 +820,9 @@ def main():
     fps = 0
 
     # 모터 상태 추적
-    motor_states = {name: 0.0 for name in motor_pins.keys()}
+    motor_names = tuple(motor_pins.keys())
+    motor_states = {name: 0.0 for name in motor_names}
+    prev_intensities = np.zeros(len(motor_names))
 
     try:
         while True:
@@ -804,17 +864,19 @@ def main():
                         # 모터 강도 계산
                         motor_intensities = calculate_motor_intensity(collisions, len(motor_pins))
 
-            # 모터 제어
-            for i, (motor_name, intensity) in enumerate(zip(motor_pins.keys(), motor_intensities)):
+            # 모터 제어 (강도가 바뀐 모터만 갱신)
+            motor_intensities = np.asarray(motor_intensities, dtype=np.float64)
+            for idx in np.flatnonzero(motor_intensities != prev_intensities):
+                motor_name = motor_names[idx]
+                intensity = float(motor_intensities[idx])
                 if intensity > 0:
-                    if motor_states[motor_name] == 0:
+                    if prev_intensities[idx] == 0 and logger.isEnabledFor(logging.INFO):
                         logger.info(f"{motor_name} 시작: {intensity:.0f}%")
                     motor_controller.set_intensity(motor_name, intensity)
-                    motor_states[motor_name] = intensity
                 else:
-                    if motor_states[motor_name] > 0:
-                        motor_controller.stop(motor_name)
-                        motor_states[motor_name] = 0
+                    motor_controller.stop(motor_name)
+                motor_states[motor_name] = intensity
+            prev_intensities = motor_intensities
 
             # 정보 표시
             output_left = draw_info(
@@ -859,7 +921,8 @@ def main():
                                     name=command['name'],
                                     equation=command['function'],
                                     equation_str=command['equation_str'],
-                                    color=command['color']
+                                    color=command['color'],
+                                    lambda_str=command.get('lambda_str')
                                 )
                                 logger.info(f"✅ 그래프 추가: {command['name']}")
                             
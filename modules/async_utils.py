@@ -0,0 +1,59 @@
+"""
+비동기 유틸리티 모듈
+
+Gemini 에이전트가 동기 코드에서 비동기 요청을 실행할 때 사용하는
+상주 이벤트 루프를 제공합니다.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """
+    별도 스레드에서 계속 실행되는 이벤트 루프
+
+    asyncio.run은 호출마다 새 루프를 만들기 때문에 루프에 묶인 gRPC 채널과
+    연결이 매번 새로 생성됩니다. 루프 하나를 유지하면 채널과 연결(keepalive)이
+    요청 사이에 재사용됩니다.
+    """
+
+    def __init__(self, name: str = "gemini-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @staticmethod
+    async def _cancel_tasks():
+        """루프에 남은 작업 취소"""
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, coro: Coroutine) -> Future:
+        """코루틴을 루프에 넣고 바로 반환 (concurrent.futures.Future)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """코루틴을 루프에서 실행하고 결과를 기다림"""
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        """남은 작업을 취소하고 루프 종료"""
+        if self.loop.is_closed():
+            return
+        try:
+            self.run(self._cancel_tasks(), timeout=1.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=1.0)
+        if not self._thread.is_alive():
+            self.loop.close()
@@ -0,0 +1,181 @@
+"""
+오디오 유틸리티 모듈
+
+Gemini 에이전트들이 공유하는 PyAudio 인스턴스, 녹음 버퍼와 녹음 데이터 처리 기능을 제공합니다.
+"""
+
+import atexit
+import io
+import logging
+import struct
+import threading
+from typing import Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# PyAudio (에이전트 모듈에서 미설치 경고 출력)
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
+# 압축 인코딩 (선택 사항, 설치: pip install soundfile)
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# RIFF/WAVE 헤더 (PCM, 44바이트)
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+# paInt16 샘플 크기 (바이트)
+SAMPLE_WIDTH = 2
+
+# 음성 구간 검출: 프레임 길이(초), 최대 에너지 대비 임계 비율, 앞뒤 여유 프레임 수
+VAD_FRAME_SECONDS = 0.02
+VAD_THRESHOLD_RATIO = 0.05
+VAD_PAD_FRAMES = 5
+
+# 업로드용 압축 형식 (우선순위 순): (형식, 서브타입, MIME)
+UPLOAD_FORMATS = (
+    ('OGG', 'OPUS', 'audio/ogg'),
+    ('FLAC', 'PCM_16', 'audio/flac'),
+)
+
+# 공유 PyAudio 인스턴스
+_PA_LOCK = threading.Lock()
+_PA = None
+
+
+def get_pyaudio():
+    """
+    프로세스 공유 PyAudio 인스턴스 (처음 호출 시 생성)
+
+    PortAudio 초기화와 장치 검색을 한 번만 하고, 종료는 프로세스 종료 시 자동으로 합니다.
+
+    Returns:
+        PyAudio 인스턴스 (pyaudio 미설치 시 None)
+    """
+    global _PA
+    if not PYAUDIO_AVAILABLE:
+        return None
+    with _PA_LOCK:
+        if _PA is None:
+            _PA = pyaudio.PyAudio()
+            atexit.register(_PA.terminate)
+    return _PA
+
+
+def pcm_to_wav(pcm, sample_rate: int, channels: int = 1,
+               sample_width: int = SAMPLE_WIDTH) -> bytes:
+    """
+    PCM 데이터 앞에 WAV 헤더를 붙입니다.
+
+    wave 모듈과 BytesIO를 거치지 않고 헤더를 직접 패킹하므로
+    녹음 버퍼는 한 번만 복사됩니다.
+
+    Args:
+        pcm: 녹음된 PCM 데이터 (bytes, bytearray 또는 int16 배열)
+        sample_rate: 샘플레이트 (Hz)
+        channels: 채널 수
+        sample_width: 샘플 크기 (바이트)
+
+    Returns:
+        WAV 형식 바이트
+    """
+    pcm = memoryview(pcm)
+    data_len = pcm.nbytes
+    block_align = channels * sample_width
+    header = WAV_HEADER.pack(
+        b'RIFF', 36 + data_len, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate,
+        sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_len
+    )
+    return header + pcm
+
+
+def voiced_range(pcm: np.ndarray, sample_rate: int, channels: int = 1) -> Tuple[int, int]:
+    """
+    녹음 앞뒤의 무음을 제외한 음성 구간을 찾습니다.
+
+    20ms 프레임별 평균 절댓값(에너지)이 최대 에너지의 5%를 넘는
+    첫/마지막 프레임을 찾고 앞뒤로 약간의 여유를 둡니다.
+
+    Args:
+        pcm: int16 샘플 배열 (채널 인터리브)
+        sample_rate: 샘플레이트 (Hz)
+        channels: 채널 수
+
+    Returns:
+        (시작, 끝) 샘플 인덱스 - 음성이 없으면 (0, 0)
+    """
+    frame = int(VAD_FRAME_SECONDS * sample_rate) * channels
+    n = (len(pcm) // frame) * frame
+    if n == 0:
+        return 0, len(pcm)
+
+    energy = np.abs(pcm[:n].reshape(-1, frame), dtype=np.int32).mean(axis=1)
+    peak = energy.max()
+    if peak == 0:
+        return 0, 0
+
+    voiced = np.flatnonzero(energy > peak * VAD_THRESHOLD_RATIO)
+    first = max(voiced[0] - VAD_PAD_FRAMES, 0)
+    last = voiced[-1] + 1 + VAD_PAD_FRAMES
+
+    # 마지막 프레임이 음성이면 남은 꼬리 샘플까지 포함
+    end = len(pcm) if last * frame >= n else last * frame
+    return int(first * frame), int(end)
+
+
+def encode_pcm(pcm: np.ndarray, sample_rate: int, channels: int = 1) -> Tuple[bytes, str]:
+    """
+    PCM을 업로드용으로 압축합니다 (Opus, 안 되면 FLAC).
+
+    soundfile이 없거나 모든 형식이 실패하면 WAV를 반환합니다.
+
+    Args:
+        pcm: int16 샘플 배열 (채널 인터리브)
+        sample_rate: 샘플레이트 (Hz)
+        channels: 채널 수
+
+    Returns:
+        (오디오 바이트, MIME 타입)
+    """
+    if SOUNDFILE_AVAILABLE:
+        samples = np.asarray(pcm, dtype=np.int16).reshape(-1, channels)
+        for fmt, subtype, mime_type in UPLOAD_FORMATS:
+            try:
+                buffer = io.BytesIO()
+                sf.write(buffer, samples, sample_rate, format=fmt, subtype=subtype)
+                return buffer.getvalue(), mime_type
+            except Exception as e:
+                logger.debug(f"{fmt}/{subtype} 인코딩 실패: {e}")
+
+    return pcm_to_wav(pcm, sample_rate, channels), 'audio/wav'
+
+
+def encode_wav(wav_data: bytes) -> Tuple[bytes, str]:
+    """
+    WAV 바이트를 업로드용으로 압축합니다.
+
+    Returns:
+        (오디오 바이트, MIME 타입) - 압축할 수 없으면 원본 WAV
+    """
+    if not SOUNDFILE_AVAILABLE:
+        return wav_data, 'audio/wav'
+
+    try:
+        samples, sample_rate = sf.read(io.BytesIO(wav_data), dtype='int16', always_2d=True)
+    except Exception as e:
+        logger.debug(f"WAV 디코딩 실패: {e}")
+        return wav_data, 'audio/wav'
+
+    data, mime_type = encode_pcm(samples.ravel(), sample_rate, samples.shape[1])
+    if mime_type == 'audio/wav':
+        return wav_data, mime_type
+    return data, mime_type
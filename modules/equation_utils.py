@@ -0,0 +1,481 @@
+"""
+방정식 유틸리티 모듈
+
+Gemini 에이전트들이 공유하는 lambda 문자열 컴파일과 방정식 히스토리 기능을 제공합니다.
+"""
+
+import ast
+import asyncio
+import json
+import logging
+from collections import deque
+from functools import lru_cache, partial
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Numba JIT (선택 사항, 설치: pip install numba)
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# lambda 문자열 평가 시 허용하는 이름
+LAMBDA_NAMESPACE = {'np': np, 'abs': abs}
+
+# lambda 본문에서 허용하는 np 함수/상수
+ALLOWED_NP_NAMES = frozenset({
+    'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan',
+    'sinh', 'cosh', 'tanh', 'exp', 'log', 'log2', 'log10', 'sqrt',
+    'abs', 'sign', 'floor', 'ceil', 'power', 'maximum', 'minimum', 'where',
+    'pi', 'e',
+})
+
+# lambda 본문에서 허용하는 AST 노드
+_ALLOWED_NODES = (
+    ast.Expression, ast.Lambda, ast.arguments, ast.arg, ast.Load,
+    ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+    ast.Constant, ast.Name, ast.Attribute, ast.Call,
+)
+
+# 응답 JSON 추출용 디코더
+_JSON_DECODER = json.JSONDecoder()
+
+# Gemini 응답 스키마: 음성 명령 하나
+COMMAND_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'action': {'type': 'STRING', 'enum': ['add_graph', 'delete_graph', 'toggle_graph', 'unknown']},
+        'name': {'type': 'STRING'},
+        'equation_str': {'type': 'STRING'},
+        'lambda_str': {'type': 'STRING'},
+        'mode': {'type': 'STRING', 'enum': ['last', 'all']},
+        'index': {'type': 'INTEGER'},
+    },
+    'required': ['action'],
+}
+
+# Gemini 응답 스키마: 배치 요청 (오디오 번호 id 포함 배열)
+BATCH_COMMAND_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {'id': {'type': 'INTEGER'}, **COMMAND_SCHEMA['properties']},
+        'required': ['id', 'action'],
+    },
+}
+
+# Gemini 응답 스키마: 텍스트 -> 방정식 변환
+EQUATION_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'name': {'type': 'STRING'},
+        'equation_str': {'type': 'STRING'},
+        'lambda_str': {'type': 'STRING'},
+    },
+    'required': ['name', 'equation_str', 'lambda_str'],
+}
+
+# 응답 하나당 최대 출력 토큰
+MAX_OUTPUT_TOKENS = 128
+
+# 그래프 색상 팔레트 (히스토리 순서대로 hue를 0.17씩 이동)
+PALETTE_HUE_STEP = 0.17
+PALETTE_SATURATION = 0.8
+PALETTE_VALUE = 0.9
+PALETTE_SIZE = 360
+
+# JIT 워밍업용 입력 (float64/int64 배열, 스칼라 시그니처)
+_WARMUP_INPUTS = (np.linspace(-1.0, 1.0, 4), 0.5, np.arange(-2, 2), 1)
+
+
+def _jit_lambda(func: Callable) -> Callable:
+    """
+    lambda를 Numba로 컴파일합니다.
+
+    float64/int64 배열과 스칼라 시그니처를 미리 컴파일한 뒤 추가 컴파일을 막아
+    렌더 루프에서 JIT 비용이 발생하지 않도록 합니다.
+    정의역 밖 입력(log(-1), 1/0)이 nan/inf로 나와야 샘플링에서 걸러지므로
+    fastmath는 사용하지 않습니다. 컴파일에 실패하면 원래 함수를 그대로 반환합니다.
+    """
+    if not NUMBA_AVAILABLE:
+        return func
+
+    try:
+        jitted = numba.njit(cache=False)(func)
+        with np.errstate(all='ignore'):
+            for warmup in _WARMUP_INPUTS:
+                jitted(warmup)
+        jitted.disable_compile()
+        return jitted
+    except Exception as e:
+        logger.debug(f"Numba 컴파일 실패, 일반 함수 사용: {e}")
+        return func
+
+
+def _typed_kernel(func: Callable) -> Callable:
+    """
+    방정식 템플릿 커널을 Numba로 감쌉니다.
+
+    실제 컴파일은 처음 호출될 때 입력 타입별로 한 번만 일어나므로
+    import 시점에는 비용이 없습니다. Numba가 없으면 numpy 함수 그대로 사용합니다.
+    """
+    if not NUMBA_AVAILABLE:
+        return func
+
+    try:
+        return numba.njit(cache=True)(func)
+    except Exception as e:
+        logger.debug(f"Numba 커널 컴파일 실패 ({func.__name__}): {e}")
+        return func
+
+
+@_typed_kernel
+def poly2(x, a, b):
+    """y = a*x^2 + b"""
+    return a * x * x + b
+
+
+@_typed_kernel
+def cubic(x, a, b):
+    """y = a*x^3 + b"""
+    return a * x * x * x + b
+
+
+@_typed_kernel
+def line(x, a, b):
+    """y = a*x + b"""
+    return a * x + b
+
+
+@_typed_kernel
+def absline(x, a, b):
+    """y = a*|x| + b"""
+    return a * np.abs(x) + b
+
+
+@_typed_kernel
+def sinusoid(x, k, a):
+    """y = a*sin(x/k)"""
+    return np.sin(x / k) * a
+
+
+@_typed_kernel
+def cosinusoid(x, k, a):
+    """y = a*cos(x/k)"""
+    return np.cos(x / k) * a
+
+
+# 템플릿 이름 -> 커널
+EQUATION_TEMPLATES = {
+    'poly2': poly2,
+    'cubic': cubic,
+    'line': line,
+    'absline': absline,
+    'sinusoid': sinusoid,
+    'cosinusoid': cosinusoid,
+}
+
+
+def template_function(name: str, **coefficients: float) -> Callable:
+    """
+    템플릿 커널에 계수를 묶은 y = f(x) 함수를 반환합니다.
+
+    예: template_function('poly2', a=0.01, b=0.0)
+    """
+    return partial(EQUATION_TEMPLATES[name], **coefficients)
+
+
+def _validate_lambda(tree: ast.Expression):
+    """
+    lambda AST가 허용된 수식만 포함하는지 검사합니다.
+
+    Raises:
+        ValueError: 허용되지 않은 구문/이름이 있을 때
+    """
+    lam = tree.body
+    if not isinstance(lam, ast.Lambda):
+        raise ValueError("lambda 식이 아닙니다")
+
+    args = lam.args
+    if (len(args.args) != 1 or args.posonlyargs or args.kwonlyargs
+            or args.vararg or args.kwarg or args.defaults):
+        raise ValueError("lambda 인자는 x 하나여야 합니다")
+    arg_name = args.args[0].arg
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"허용되지 않은 구문: {type(node).__name__}")
+
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"허용되지 않은 상수: {node.value!r}")
+
+        elif isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == 'np'
+                    and node.attr in ALLOWED_NP_NAMES):
+                raise ValueError(f"허용되지 않은 속성: {node.attr}")
+
+        elif isinstance(node, ast.Name):
+            if node.id not in (arg_name, 'np', 'abs'):
+                raise ValueError(f"허용되지 않은 이름: {node.id}")
+
+        elif isinstance(node, ast.Call):
+            if node.keywords:
+                raise ValueError("키워드 인자는 허용되지 않습니다")
+            func = node.func
+            if not (isinstance(func, ast.Attribute)
+                    or (isinstance(func, ast.Name) and func.id == 'abs')):
+                raise ValueError("허용되지 않은 함수 호출")
+
+    # np는 속성 접근으로만 사용 가능
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            if (isinstance(child, ast.Name) and child.id == 'np'
+                    and not isinstance(node, ast.Attribute)):
+                raise ValueError("np는 np.<함수> 형태로만 사용할 수 있습니다")
+
+
+@lru_cache(maxsize=256)
+def compile_lambda(lambda_str: str) -> Callable:
+    """
+    lambda 문자열을 함수로 컴파일합니다.
+
+    AST를 검사해 허용된 수식(사칙연산, 비교, np 수학 함수)만 통과시키고,
+    같은 문자열은 캐시된 함수를 그대로 반환합니다.
+    Numba가 설치되어 있으면 네이티브 코드로 JIT 컴파일합니다.
+
+    Args:
+        lambda_str: "lambda x: ..." 형태의 문자열
+
+    Returns:
+        y = f(x) 함수
+
+    Raises:
+        ValueError: 구문 오류 또는 허용되지 않은 코드
+    """
+    try:
+        tree = ast.parse(lambda_str.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"lambda 구문 오류: {e}") from e
+
+    _validate_lambda(tree)
+
+    code = compile(tree, '<lambda>', 'eval')
+    func = eval(code, {**LAMBDA_NAMESPACE, '__builtins__': {}})
+    return _jit_lambda(func)
+
+
+def _precompile_lambdas(lambda_strs: List[str]):
+    """lambda 문자열들을 컴파일해 compile_lambda 캐시에 넣습니다 (잘못된 문자열은 무시)."""
+    for lambda_str in lambda_strs:
+        try:
+            compile_lambda(lambda_str)
+        except Exception as e:
+            logger.debug(f"lambda 사전 컴파일 실패: {e}")
+
+
+async def warm_lambda_cache(response_text: str):
+    """
+    응답에 포함된 lambda_str을 워커 스레드에서 미리 컴파일합니다.
+
+    Numba JIT 컴파일은 수백 ms가 걸릴 수 있으므로, 응답을 파싱하기 전에
+    이벤트 루프 밖에서 compile_lambda 캐시를 채워 파싱 중에는 캐시만 조회하게 합니다.
+    """
+    data = extract_json(response_text)
+    items = data if isinstance(data, list) else [data]
+    lambda_strs = [
+        item['lambda_str'] for item in items
+        if isinstance(item, dict) and isinstance(item.get('lambda_str'), str)
+    ]
+    if lambda_strs:
+        await asyncio.to_thread(_precompile_lambdas, lambda_strs)
+
+
+def json_generation_config(schema: Dict[str, Any], count: int = 1) -> Dict[str, Any]:
+    """
+    JSON 모드 생성 설정 (스키마 고정, 출력 길이 제한, temperature 0)
+
+    Args:
+        schema: 응답 스키마
+        count: 응답에 포함될 명령 수 (배치 요청)
+    """
+    return {
+        'response_mime_type': 'application/json',
+        'response_schema': schema,
+        'max_output_tokens': MAX_OUTPUT_TOKENS * count,
+        'temperature': 0,
+    }
+
+
+def extract_json(response_text: str) -> Optional[Any]:
+    """
+    응답 텍스트에서 첫 번째 JSON 객체/배열을 추출합니다.
+
+    코드 블록이나 앞뒤 설명 문장은 건너뛰고, 중첩된 괄호도 처리합니다.
+
+    Returns:
+        디코딩된 값 (dict 또는 list), 없으면 None
+    """
+    start = 0
+    while True:
+        brace = response_text.find('{', start)
+        bracket = response_text.find('[', start)
+        candidates = [i for i in (brace, bracket) if i >= 0]
+        if not candidates:
+            return None
+        start = min(candidates)
+        try:
+            data, _ = _JSON_DECODER.raw_decode(response_text, start)
+            return data
+        except json.JSONDecodeError:
+            start += 1
+
+
+def hsv_to_rgb_array(h: np.ndarray, s: float, v: float) -> np.ndarray:
+    """
+    HSV -> RGB 벡터화 변환 (colorsys.hsv_to_rgb와 동일한 공식)
+
+    Args:
+        h: hue 배열 (0~1)
+        s: 채도 (0~1)
+        v: 명도 (0~1)
+
+    Returns:
+        (N, 3) RGB 배열 (0~1)
+    """
+    h = np.asarray(h, dtype=np.float64)
+    i = np.floor(h * 6.0).astype(np.int64) % 6
+    f = h * 6.0 - np.floor(h * 6.0)
+    p = np.full_like(h, v * (1.0 - s))
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    v = np.full_like(h, v)
+
+    # 구간 i별 (r, g, b) 선택
+    table = np.stack([
+        np.stack([v, t, p], axis=-1),
+        np.stack([q, v, p], axis=-1),
+        np.stack([p, v, t], axis=-1),
+        np.stack([p, q, v], axis=-1),
+        np.stack([t, p, v], axis=-1),
+        np.stack([v, p, q], axis=-1),
+    ])
+    return table[i, np.arange(len(h))]
+
+
+# 1도 단위 hue 팔레트 (uint8, 두 에이전트가 공유)
+PALETTE = (hsv_to_rgb_array(
+    np.arange(PALETTE_SIZE) / PALETTE_SIZE, PALETTE_SATURATION, PALETTE_VALUE
+) * 255).astype(np.uint8)
+PALETTE.flags.writeable = False
+
+
+def palette_colors(start: int, count: int) -> np.ndarray:
+    """
+    히스토리 인덱스 [start, start + count)의 그래프 색상 (팔레트 조회)
+
+    Returns:
+        (count, 3) uint8 RGB 배열
+    """
+    indices = np.arange(start, start + count) * (PALETTE_HUE_STEP * PALETTE_SIZE)
+    return PALETTE[indices.astype(np.int64) % PALETTE_SIZE]
+
+
+def palette_color(index: int) -> np.ndarray:
+    """히스토리 인덱스 index의 그래프 색상 (uint8 RGB)"""
+    return PALETTE[int(index * (PALETTE_HUE_STEP * PALETTE_SIZE)) % PALETTE_SIZE]
+
+
+class EquationStore:
+    """
+    방정식 히스토리 (열 단위 저장, 최대 maxlen개)
+
+    항목마다 딕셔너리를 만드는 대신 필드별 deque와 (maxlen, 3) uint8 색상 링 버퍼로 보관합니다.
+    가득 차면 가장 오래된 항목부터 밀려나며, 색상은 누적 추가 횟수로 정해지므로
+    오래된 항목이 빠져도 색상 순서가 유지됩니다.
+    """
+
+    # 기본 최대 항목 수
+    MAX_SIZE = 1024
+
+    def __init__(self, maxlen: int = MAX_SIZE):
+        self.maxlen = maxlen
+        self.inputs: Deque[Optional[str]] = deque(maxlen=maxlen)
+        self.names: Deque[str] = deque(maxlen=maxlen)
+        self.equation_strs: Deque[str] = deque(maxlen=maxlen)
+        self.lambda_strs: Deque[Optional[str]] = deque(maxlen=maxlen)
+        self.functions: Deque[Callable] = deque(maxlen=maxlen)
+        self._colors = np.zeros((maxlen, 3), dtype=np.uint8)
+        self._count = 0  # 누적 추가 횟수 (색상 인덱스)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def colors(self) -> np.ndarray:
+        """(N, 3) uint8 색상 배열 (오래된 순)"""
+        if self._count <= self.maxlen:
+            return self._colors[:self._count]
+        head = self._count % self.maxlen
+        return np.concatenate([self._colors[head:], self._colors[:head]])
+
+    def next_color(self) -> Tuple[int, int, int]:
+        """다음 항목에 쓸 팔레트 색상"""
+        return tuple(palette_color(self._count).tolist())
+
+    def add(self, name: str, equation_str: str, function: Callable,
+            color: Optional[Tuple[int, int, int]] = None,
+            lambda_str: Optional[str] = None,
+            input_text: Optional[str] = None) -> int:
+        """
+        방정식 추가
+
+        Args:
+            color: 지정하지 않으면 팔레트 색상 사용
+            input_text: 방정식을 생성한 입력 문장
+
+        Returns:
+            누적 추가 횟수 기준 항목 번호
+        """
+        index = self._count
+        self._colors[index % self.maxlen] = palette_color(index) if color is None else color
+
+        self.inputs.append(input_text)
+        self.names.append(name)
+        self.equation_strs.append(equation_str)
+        self.lambda_strs.append(lambda_str)
+        self.functions.append(function)
+        self._count += 1
+        return index
+
+    def clear(self):
+        """히스토리 초기화 (색상 순서도 처음부터)"""
+        self.inputs.clear()
+        self.names.clear()
+        self.equation_strs.clear()
+        self.lambda_strs.clear()
+        self.functions.clear()
+        self._count = 0
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        """기존 딕셔너리 리스트 형태로 반환 (호환용)"""
+        return [
+            {
+                'input': input_text,
+                'name': name,
+                'equation_str': equation_str,
+                'lambda_str': lambda_str,
+                'function': function,
+                'color': tuple(color.tolist()),
+            }
+            for input_text, name, equation_str, lambda_str, function, color in zip(
+                self.inputs, self.names, self.equation_strs,
+                self.lambda_strs, self.functions, self.colors
+            )
+        ]
@@ -4,14 +4,23 @@ Gemini API 음성 인식 및 방정식 변환 에이전트
 Gemini 멀티모달 기능으로 오디오를 직접 처리하여 명령 실행
 """
 
+import asyncio
 import logging
-import json
 import re
-import io
-import wave
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
 
+from .async_utils import BackgroundLoop
+from .audio_utils import pcm_to_wav, encode_wav, voiced_range, get_pyaudio
+from .equation_utils import (
+    compile_lambda, extract_json, json_generation_config, template_function,
+    warm_lambda_cache,
+    EquationStore, COMMAND_SCHEMA, EQUATION_SCHEMA,
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -34,6 +43,53 @@ except ImportError:
     PYAUDIO_AVAILABLE = False
 
 
+# 기본 파서 키워드 패턴 (Gemini 사용 불가 시)
+_FALLBACK_PATTERNS = {
+    '제곱|이차|포물선|parabola': {
+        'name': '포물선',
+        'equation_str': 'y = x^2 / 100',
+        'lambda_str': 'lambda x: (x**2) / 100',
+        'function': template_function('poly2', a=1 / 100, b=0.0)
+    },
+    '사인|sin': {
+        'name': '사인파',
+        'equation_str': 'y = sin(x/50) * 100',
+        'lambda_str': 'lambda x: np.sin(x/50) * 100',
+        'function': template_function('sinusoid', k=50.0, a=100.0)
+    },
+    '코사인|cos': {
+        'name': '코사인파',
+        'equation_str': 'y = cos(x/30) * 80',
+        'lambda_str': 'lambda x: np.cos(x/30) * 80',
+        'function': template_function('cosinusoid', k=30.0, a=80.0)
+    },
+    '직선|일차|선형': {
+        'name': '직선',
+        'equation_str': 'y = 2*x',
+        'lambda_str': 'lambda x: 2 * x',
+        'function': template_function('line', a=2.0, b=0.0)
+    },
+    '절댓값|절대값|absolute': {
+        'name': 'V자 그래프',
+        'equation_str': 'y = |x| / 2',
+        'lambda_str': 'lambda x: abs(x) / 2',
+        'function': template_function('absline', a=1 / 2, b=0.0)
+    },
+    '세제곱|삼차|cubic': {
+        'name': '삼차함수',
+        'equation_str': 'y = x^3 / 10000',
+        'lambda_str': 'lambda x: (x**3) / 10000',
+        'function': template_function('cubic', a=1 / 10000, b=0.0)
+    },
+}
+
+# 모든 패턴을 이름 있는 그룹의 단일 alternation으로 미리 컴파일
+_FALLBACK_RE = re.compile('|'.join(
+    f'(?P<k{i}>{pattern})' for i, pattern in enumerate(_FALLBACK_PATTERNS)
+))
+_FALLBACK_EQUATIONS = list(_FALLBACK_PATTERNS.values())
+
+
 class GeminiMathAgent:
     """
     Gemini API를 사용한 수학 방정식 에이전트
@@ -41,6 +97,9 @@ class GeminiMathAgent:
     Gemini 멀티모달로 오디오를 직접 처리하여 명령 실행
     """
     
+    # 동일 텍스트 명령 결과 캐시 크기 (LRU)
+    RESULT_CACHE_SIZE = 64
+    
     def __init__(self, api_key: Optional[str] = None):
         """
         Args:
@@ -61,14 +120,35 @@ class GeminiMathAgent:
         else:
             logger.warning("Gemini API 사용 불가 (API 키 없음 또는 라이브러리 미설치)")
         
+        # 비동기 요청용 상주 이벤트 루프 (gRPC 채널/연결 재사용)
+        self._loop = BackgroundLoop()
+        if self.model:
+            self._loop.submit(self._warm_up())
+        
         # PyAudio 설정
-        self.pyaudio = pyaudio.PyAudio() if PYAUDIO_AVAILABLE else None
+        self.pyaudio = get_pyaudio()
         self.sample_rate = 16000  # Gemini 권장 샘플레이트
         self.channels = 1
         self.chunk = 1024
         
-        # 방정식 히스토리
-        self.equation_history: List[Dict[str, Any]] = []
+        # 입력 스트림 (처음 녹음할 때 열고 cleanup까지 재사용)
+        self._stream = None
+        self._capture: Optional[np.ndarray] = None
+        self._captured = 0
+        
+        # 방정식 히스토리 (열 단위 저장)
+        self.equation_store = EquationStore()
+        
+        # 명령 결과 캐시 (키 -> 결과, LRU)
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    
+    async def _warm_up(self):
+        """토큰 수 조회로 gRPC 채널을 미리 연결 (첫 명령의 연결 지연 제거)"""
+        try:
+            await self.model.count_tokens_async("ping")
+            logger.debug("Gemini 연결 준비 완료")
+        except Exception as e:
+            logger.debug(f"Gemini 연결 준비 실패: {e}")
     
     def record_audio(self, duration: int = 5) -> Optional[bytes]:
         """
@@ -87,52 +167,91 @@ class GeminiMathAgent:
         logger.info(f"🎤 {duration}초 동안 녹음을 시작합니다...")
         
         try:
-            # 오디오 스트림 열기
-            stream = self.pyaudio.open(
-                format=pyaudio.paInt16,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
+            # 녹음마다 새로 할당하는 버퍼 (콜백이 직접 채움)
+            self._capture = np.empty(int(self.sample_rate * duration) * self.channels, dtype=np.int16)
+            self._captured = 0
             
-            frames = []
-            num_chunks = int(self.sample_rate / self.chunk * duration)
+            # 오디오 스트림 (콜백 모드, 처음 한 번만 열기)
+            if self._stream is None:
+                self._stream = self.pyaudio.open(
+                    format=pyaudio.paInt16,
+                    channels=self.channels,
+                    rate=self.sample_rate,
+                    input=True,
+                    frames_per_buffer=self.chunk,
+                    stream_callback=self._audio_callback,
+                    start=False
+                )
+            self._stream.start_stream()
             
-            # 녹음
-            for i in range(num_chunks):
-                data = stream.read(self.chunk)
-                frames.append(data)
-                
-                # 진행 표시
-                if i % (num_chunks // 10) == 0:
-                    progress = int((i / num_chunks) * 100)
-                    logger.info(f"📊 녹음 중... {progress}%")
+            # 버퍼가 찰 때까지 대기
+            while self._stream.is_active():
+                time.sleep(0.05)
             
             logger.info("✓ 녹음 완료")
             
-            # 스트림 닫기
-            stream.stop_stream()
-            stream.close()
-            
-            # WAV 파일로 변환
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.pyaudio.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(frames))
+            # 스트림 정지 (닫지 않고 다음 녹음에 재사용)
+            self._stream.stop_stream()
             
-            return wav_buffer.getvalue()
+            # 앞뒤 무음 제거 후 WAV 형식으로 변환
+            pcm = self._capture[:self._captured]
+            start, end = voiced_range(pcm, self.sample_rate, self.channels)
+            if end <= start:
+                logger.warning("음성이 감지되지 않았습니다")
+                return None
+            return pcm_to_wav(pcm[start:end], self.sample_rate, self.channels)
             
         except Exception as e:
             logger.error(f"❌ 녹음 오류: {e}")
             return None
     
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        """PyAudio 스트림 콜백: 들어온 샘플을 녹음 버퍼에 복사"""
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        written = self._captured
+        n = min(len(samples), len(self._capture) - written)
+        self._capture[written:written + n] = samples[:n]
+        self._captured = written + n
+        if self._captured >= len(self._capture):
+            return (None, pyaudio.paComplete)
+        return (None, pyaudio.paContinue)
+    
     def process_audio_command(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
         """
         오디오 데이터를 Gemini 멀티모달로 처리하여 명령 실행
         
+        process_audio_command_async의 동기 래퍼입니다.
+        
+        Args:
+            audio_data: WAV 형식 오디오 바이트
+            
+        Returns:
+            실행할 명령 정보 또는 None
+        """
+        return self._loop.run(self.process_audio_command_async(audio_data))
+    
+    def process_audio_commands(self, audio_batch: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """
+        여러 오디오 명령을 동시에 Gemini로 처리합니다.
+        
+        요청들이 동시에 진행되므로 전체 시간은 가장 느린 요청 하나 정도입니다.
+        
+        Args:
+            audio_batch: WAV 형식 오디오 바이트 리스트
+            
+        Returns:
+            입력 순서대로 명령 정보 또는 None 리스트
+        """
+        async def _gather():
+            return await asyncio.gather(
+                *[self.process_audio_command_async(a) for a in audio_batch]
+            )
+        return self._loop.run(_gather())
+    
+    async def process_audio_command_async(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        오디오 데이터를 Gemini 멀티모달로 처리하여 명령 실행 (비동기)
+        
         Args:
             audio_data: WAV 형식 오디오 바이트
             
@@ -149,20 +268,25 @@ class GeminiMathAgent:
             # Gemini에 오디오와 프롬프트 전송
             prompt = self._create_audio_prompt()
             
-            # 오디오 파일 객체 생성
+            # 오디오 파일 객체 생성 (압축 인코딩은 스레드에서)
+            data, mime_type = await asyncio.to_thread(encode_wav, audio_data)
             audio_file = {
-                'mime_type': 'audio/wav',
-                'data': audio_data
+                'mime_type': mime_type,
+                'data': data
             }
             
             # Gemini 멀티모달 요청
-            response = self.model.generate_content([prompt, audio_file])
+            response = await self.model.generate_content_async(
+                [prompt, audio_file],
+                generation_config=json_generation_config(COMMAND_SCHEMA)
+            )
             
-            # 응답 파싱
+            # 응답 파싱 (lambda JIT 컴파일은 이벤트 루프 밖에서)
+            await warm_lambda_cache(response.text)
             result = self._parse_audio_response(response.text)
             
             if result:
-                logger.info(f"✓ 명령 인식: {result['action']} - {result.get('description', '')}")
+                logger.info(f"✓ 명령 인식: {result['action']}")
                 return result
             else:
                 logger.warning("❌ 명령을 인식하지 못했습니다")
@@ -176,6 +300,8 @@ class GeminiMathAgent:
         """
         텍스트 명령을 수학 방정식으로 변환합니다.
         
+        text_to_equation_async의 동기 래퍼입니다.
+        
         Args:
             text: 자연어 명령 (예: "x 제곱 그래프 그려줘")
             
@@ -188,24 +314,45 @@ class GeminiMathAgent:
                 'color': tuple         # RGB 색상
             }
         """
+        return self._loop.run(self.text_to_equation_async(text))
+    
+    async def text_to_equation_async(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        텍스트 명령을 수학 방정식으로 변환합니다. (비동기)
+        
+        Args:
+            text: 자연어 명령 (예: "x 제곱 그래프 그려줘")
+            
+        Returns:
+            text_to_equation과 동일
+        """
         if not self.model:
             logger.warning("Gemini API 사용 불가 - 기본 파서 사용")
             return self._fallback_parser(text)
         
+        cache_key = self._cache_key('text', text.strip().lower().encode('utf-8'))
+        cached = self._get_cached_result(cache_key)
+        if cached is not None:
+            self._record_history(cached, text)
+            logger.info(f"✓ 방정식 생성 (캐시): {cached['name']} = {cached['equation_str']}")
+            return cached
+        
         try:
             # Gemini에게 프롬프트 전송
             prompt = self._create_conversion_prompt(text)
-            response = self.model.generate_content(prompt)
+            response = await self.model.generate_content_async(
+                prompt,
+                generation_config=json_generation_config(EQUATION_SCHEMA)
+            )
             
-            # 응답 파싱
+            # 응답 파싱 (lambda JIT 컴파일은 이벤트 루프 밖에서)
+            await warm_lambda_cache(response.text)
             result = self._parse_gemini_response(response.text)
             
             if result:
                 # 히스토리에 추가
-                self.equation_history.append({
-                    'input': text,
-                    'result': result
-                })
+                self._record_history(result, text)
+                self._cache_result(cache_key, result)
                 logger.info(f"✓ 방정식 생성: {result['name']} = {result['equation_str']}")
                 return result
             else:
@@ -216,6 +363,36 @@ class GeminiMathAgent:
             logger.error(f"Gemini API 오류: {e}")
             return self._fallback_parser(text)
     
+    def _record_history(self, result: Dict[str, Any], input_text: Optional[str] = None):
+        """생성된 방정식을 히스토리에 추가"""
+        self.equation_store.add(
+            result['name'],
+            result['equation_str'],
+            result['function'],
+            color=result.get('color'),
+            lambda_str=result.get('lambda_str'),
+            input_text=input_text
+        )
+    
+    def _cache_key(self, kind: str, payload: bytes) -> str:
+        """결과 캐시 키 (종류 + SHA1)"""
+        return f"{kind}:{hashlib.sha1(payload).hexdigest()}"
+    
+    def _get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """캐시된 결과 반환 (없으면 None)"""
+        result = self._result_cache.get(key)
+        if result is None:
+            return None
+        self._result_cache.move_to_end(key)
+        return dict(result)
+    
+    def _cache_result(self, key: str, result: Dict[str, Any]):
+        """결과를 캐시에 저장 (LRU)"""
+        self._result_cache[key] = dict(result)
+        self._result_cache.move_to_end(key)
+        if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+    
     def _create_audio_prompt(self) -> str:
         """
         오디오 처리를 위한 Gemini 프롬프트 생성
@@ -240,8 +417,7 @@ class GeminiMathAgent:
     "action": "add_graph",
     "name": "방정식 이름 (한글)",
     "equation_str": "수학 표현식 (예: x², sin(x))",
-    "lambda_str": "lambda x: 파이썬 표현식",
-    "description": "무엇을 그렸는지 설명"
+    "lambda_str": "lambda x: 파이썬 표현식"
 }
 
 예시:
@@ -251,27 +427,23 @@ class GeminiMathAgent:
 **그래프 삭제인 경우:**
 {
     "action": "delete_graph",
-    "mode": "last" 또는 "all",
-    "description": "무엇을 삭제했는지"
+    "mode": "last" 또는 "all"
 }
 
 **그래프 토글인 경우:**
 {
     "action": "toggle_graph",
-    "index": 숫자 (1부터 시작),
-    "description": "무엇을 했는지"
+    "index": 숫자 (1부터 시작)
 }
 
 **인식 불가인 경우:**
 {
-    "action": "unknown",
-    "description": "들은 내용 설명"
+    "action": "unknown"
 }
 
 주의사항:
 - lambda_str에서 수학 함수는 np.를 붙여주세요 (np.sin, np.cos, np.tan, np.exp, np.log, np.sqrt)
 - 반드시 JSON 형식으로만 응답하세요
-- 설명은 짧고 명확하게
 """
         return prompt
     
@@ -280,14 +452,13 @@ class GeminiMathAgent:
         Gemini 오디오 응답 파싱
         """
         try:
-            # JSON 추출 (코드 블록 제거)
-            json_text = response_text.strip()
-            if '```json' in json_text:
-                json_text = json_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in json_text:
-                json_text = json_text.split('```')[1].split('```')[0].strip()
+            # JSON 추출
+            data = extract_json(response_text)
+            if not isinstance(data, dict):
+                logger.warning("JSON 형식을 찾을 수 없습니다")
+                logger.debug(f"응답 텍스트: {response_text}")
+                return None
             
-            data = json.loads(json_text)
             action = data.get('action', 'unknown')
             
             if action == 'add_graph':
@@ -298,13 +469,10 @@ class GeminiMathAgent:
                 
                 # Lambda 함수 생성
                 try:
-                    func = eval(lambda_str, {'np': np, '__builtins__': {}})
+                    func = compile_lambda(lambda_str)
                     
-                    # 색상 생성 (히스토리 기반)
-                    import colorsys
-                    hue = (len(self.equation_history) * 0.17) % 1.0
-                    rgb = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
-                    color = tuple(int(c * 255) for c in rgb)
+                    # 색상 생성 (히스토리 기반 팔레트)
+                    color = self.equation_store.next_color()
                     
                     result = {
                         'action': 'add_graph',
@@ -312,11 +480,10 @@ class GeminiMathAgent:
                         'equation_str': equation_str,
                         'lambda_str': lambda_str,
                         'function': func,
-                        'color': color,
-                        'description': data.get('description', '')
+                        'color': color
                     }
                     
-                    self.equation_history.append(result)
+                    self._record_history(result)
                     return result
                     
                 except Exception as e:
@@ -326,31 +493,37 @@ class GeminiMathAgent:
             elif action == 'delete_graph':
                 return {
                     'action': 'delete_graph',
-                    'mode': data.get('mode', 'last'),
-                    'description': data.get('description', '')
+                    'mode': data.get('mode', 'last')
                 }
             
             elif action == 'toggle_graph':
                 return {
                     'action': 'toggle_graph',
-                    'index': data.get('index', 1) - 1,  # 0-based
-                    'description': data.get('description', '')
+                    'index': data.get('index', 1) - 1  # 0-based
                 }
             
             else:
-                logger.warning(f"알 수 없는 명령: {data.get('description', '')}")
+                logger.warning(f"알 수 없는 명령: {action}")
                 return None
                 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON 파싱 실패: {e}")
-            logger.debug(f"응답 텍스트: {response_text}")
-            return None
         except Exception as e:
             logger.error(f"응답 처리 오류: {e}")
             return None
+    
+    def _create_conversion_prompt(self, text: str) -> str:
+        """
+        텍스트 → 방정식 변환을 위한 Gemini 프롬프트 생성
+        """
+        prompt = f"""
+당신은 자연어 명령을 수학 방정식으로 변환하는 어시스턴트입니다.
+
+사용자 명령: "{text}"
+
+다음 JSON 형식으로 응답하세요:
+{{
+    "name": "방정식 이름 (한글)",
     "equation_str": "수식 표현 (예: y = x^2)",
-    "lambda_str": "lambda x: ...",
-    "description": "설명"
+    "lambda_str": "lambda x: ..."
 }}
 
 규칙:
@@ -373,15 +546,12 @@ JSON만 출력하세요:
         Gemini 응답을 파싱합니다.
         """
         try:
-            # JSON 추출 (코드 블록 제거)
-            json_match = re.search(r'\{[^}]+\}', response_text, re.DOTALL)
-            if not json_match:
+            # JSON 추출
+            data = extract_json(response_text)
+            if not isinstance(data, dict):
                 logger.warning("JSON 형식을 찾을 수 없습니다")
                 return None
             
-            json_str = json_match.group(0)
-            data = json.loads(json_str)
-            
             # 필수 필드 확인
             required_fields = ['name', 'equation_str', 'lambda_str']
             if not all(field in data for field in required_fields):
@@ -390,7 +560,7 @@ JSON만 출력하세요:
             
             # Lambda 함수 생성
             try:
-                func = eval(data['lambda_str'])
+                func = compile_lambda(data['lambda_str'])
                 
                 # 함수 테스트
                 test_value = func(0)
@@ -410,13 +580,9 @@ JSON만 출력하세요:
                 'equation_str': data['equation_str'],
                 'lambda_str': data['lambda_str'],
                 'function': func,
-                'color': color,
-                'description': data.get('description', '')
+                'color': color
             }
             
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON 파싱 오류: {e}")
-            return None
         except Exception as e:
             logger.error(f"응답 파싱 오류: {e}")
             return None
@@ -429,54 +595,15 @@ JSON만 출력하세요:
         """
         text_lower = text.lower()
         
-        # 키워드 매칭
-        patterns = {
-            '제곱|이차|포물선|parabola': {
-                'name': '포물선',
-                'equation_str': 'y = x^2 / 100',
-                'lambda_str': 'lambda x: (x**2) / 100',
-                'function': lambda x: (x**2) / 100
-            },
-            '사인|sin': {
-                'name': '사인파',
-                'equation_str': 'y = sin(x/50) * 100',
-                'lambda_str': 'lambda x: np.sin(x/50) * 100',
-                'function': lambda x: np.sin(x/50) * 100
-            },
-            '코사인|cos': {
-                'name': '코사인파',
-                'equation_str': 'y = cos(x/30) * 80',
-                'lambda_str': 'lambda x: np.cos(x/30) * 80',
-                'function': lambda x: np.cos(x/30) * 80
-            },
-            '직선|일차|선형': {
-                'name': '직선',
-                'equation_str': 'y = 2*x',
-                'lambda_str': 'lambda x: 2 * x',
-                'function': lambda x: 2 * x
-            },
-            '절댓값|절대값|absolute': {
-                'name': 'V자 그래프',
-                'equation_str': 'y = |x| / 2',
-                'lambda_str': 'lambda x: abs(x) / 2',
-                'function': lambda x: abs(x) / 2
-            },
-            '세제곱|삼차|cubic': {
-                'name': '삼차함수',
-                'equation_str': 'y = x^3 / 10000',
-                'lambda_str': 'lambda x: (x**3) / 10000',
-                'function': lambda x: (x**3) / 10000
-            },
-        }
-        
-        for pattern, equation_data in patterns.items():
-            if re.search(pattern, text_lower):
-                color = tuple(np.random.randint(50, 255, 3).tolist())
-                return {
-                    **equation_data,
-                    'color': color,
-                    'description': f'"{text}"로부터 생성'
-                }
+        # 키워드 매칭 (단일 정규식 스캔)
+        match = _FALLBACK_RE.search(text_lower)
+        if match:
+            equation_data = _FALLBACK_EQUATIONS[int(match.lastgroup[1:])]
+            color = tuple(np.random.randint(50, 255, 3).tolist())
+            return {
+                **equation_data,
+                'color': color,
+            }
         
         # 매칭 실패
         logger.warning(f"'{text}'에 해당하는 방정식을 찾을 수 없습니다")
@@ -502,14 +629,21 @@ JSON만 출력하세요:
         """
         방정식 생성 히스토리 반환
         """
-        return self.equation_history
+        return self.equation_store.as_dicts()
     
     def clear_history(self):
         """
         히스토리 초기화
         """
-        self.equation_history.clear()
+        self.equation_store.clear()
         logger.info("히스토리 초기화 완료")
+    
+    def cleanup(self):
+        """리소스 정리"""
+        if self._stream:
+            self._stream.close()
+            self._stream = None
+        self._loop.close()
 
 
 # 테스트 코드
@@ -4,14 +4,22 @@ Gemini API 멀티모달 음성 인식 에이전트
 Gemini의 오디오 처리 기능으로 음성 명령을 직접 처리
 """
 
+import asyncio
 import logging
-import json
 import io
-import wave
 import time
 from typing import Optional, Dict, Any, List
 import numpy as np
 
+from .async_utils import BackgroundLoop
+from .audio_utils import (
+    pcm_to_wav, encode_wav, voiced_range, get_pyaudio,
+)
+from .equation_utils import (
+    compile_lambda, extract_json, json_generation_config, EquationStore,
+    COMMAND_SCHEMA, BATCH_COMMAND_SCHEMA, warm_lambda_cache,
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -32,11 +40,75 @@ except ImportError:
     PYAUDIO_AVAILABLE = False
 
 
+# 음성 명령 프롬프트
+AUDIO_PROMPT = """
+당신은 수학 그래프 시스템 음성 어시스턴트입니다.
+사용자 음성을 듣고 JSON으로 응답하세요.
+
+**명령 타입:**
+1. **그래프 추가** (수학 방정식)
+2. **그래프 삭제** (마지막 또는 전체)
+3. **그래프 토글** (특정 그래프 숨김/표시)
+
+**응답 형식:**
+
+그래프 추가:
+{
+  "action": "add_graph",
+  "name": "방정식 이름",
+  "equation_str": "수학 표현식",
+  "lambda_str": "lambda x: 파이썬 표현식"
+}
+
+예시:
+- "x 제곱" → {"action": "add_graph", "name": "제곱함수", "equation_str": "x²", "lambda_str": "lambda x: x**2"}
+- "사인 x" → {"action": "add_graph", "name": "사인함수", "equation_str": "sin(x)", "lambda_str": "lambda x: np.sin(x/50)*100"}
+
+그래프 삭제:
+{
+  "action": "delete_graph",
+  "mode": "last" 또는 "all"
+}
+
+그래프 토글:
+{
+  "action": "toggle_graph",
+  "index": 숫자 (1부터)
+}
+
+인식 불가:
+{
+  "action": "unknown"
+}
+
+주의: numpy 함수는 np. 접두사 필요 (np.sin, np.cos, np.tan, np.exp, np.log, np.sqrt)
+JSON만 출력하세요.
+"""
+
+# 배치 요청용 추가 지시 (오디오 여러 개를 한 번에 처리)
+BATCH_PROMPT_SUFFIX = """
+이번 요청에는 오디오가 {count}개 있으며 각 오디오 앞에 "오디오 <번호>:"가 붙어 있습니다.
+각 오디오를 위 형식대로 해석하고, "id"(오디오 번호) 필드를 추가한 JSON 배열로 응답하세요.
+예: [{{"id": 0, "action": "add_graph", ...}}, {{"id": 1, "action": "delete_graph", "mode": "last"}}]
+JSON 배열만 출력하세요.
+"""
+
+
 class GeminiAudioAgent:
     """
     Gemini 멀티모달 오디오 처리 에이전트
     """
     
+    # 마이크로 배치 설정: 최대 개수 또는 대기 시간(초)에 도달하면 한 번에 요청
+    BATCH_MAX_SIZE = 8
+    BATCH_TIMEOUT = 0.15
+    
+    # 최대 녹음 길이(초): 캡처 버퍼 크기
+    MAX_RECORD_SECONDS = 60
+    
+    # 이 크기 이하의 오디오는 파일 업로드 없이 요청에 직접 포함 (바이트)
+    INLINE_AUDIO_MAX_BYTES = 15 * 1024 * 1024
+    
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key
         self.model = None
@@ -44,21 +116,47 @@ class GeminiAudioAgent:
         if GEMINI_AVAILABLE and api_key:
             try:
                 genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
+                # 공통 지시는 system_instruction으로 고정하고 요청마다 오디오만 전송
+                self.model = genai.GenerativeModel(
+                    'gemini-1.5-flash',
+                    system_instruction=AUDIO_PROMPT
+                )
                 logger.info("✓ Gemini 멀티모달 초기화 완료")
             except Exception as e:
                 logger.error(f"Gemini 초기화 실패: {e}")
         
-        self.pyaudio = pyaudio.PyAudio() if PYAUDIO_AVAILABLE else None
+        # 비동기 요청용 상주 이벤트 루프 (gRPC 채널/연결과 배치 큐 재사용)
+        self._loop = BackgroundLoop()
+        if self.model:
+            self._loop.submit(self._warm_up())
+        
+        self.pyaudio = get_pyaudio()
         self.sample_rate = 16000
         self.channels = 1
         self.chunk = 1024
-        self.equation_history = []
+        self.equation_store = EquationStore()
         
         # 녹음 상태
         self.is_recording = False
         self.stream = None
-        self.frames = []
+        
+        # 콜백이 채우는 고정 크기 캡처 버퍼 (int16 샘플, 쓰기 위치 _w)
+        # 다른 에이전트와 공유하지 않는 이 인스턴스 전용 버퍼
+        self._ring = np.empty(self.sample_rate * self.channels * self.MAX_RECORD_SECONDS, dtype=np.int16)
+        self._w = 0
+        
+        # 마이크로 배치 큐 (이벤트 루프별로 생성)
+        self._batch_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+    
+    async def _warm_up(self):
+        """토큰 수 조회로 gRPC 채널을 미리 연결 (첫 명령의 연결 지연 제거)"""
+        try:
+            await self.model.count_tokens_async("ping")
+            logger.debug("Gemini 연결 준비 완료")
+        except Exception as e:
+            logger.debug(f"Gemini 연결 준비 실패: {e}")
     
     def start_recording(self) -> bool:
         """
@@ -71,22 +169,29 @@ class GeminiAudioAgent:
             logger.error("PyAudio 사용 불가")
             return False
         
-        if hasattr(self, 'stream') and self.stream:
+        if self.is_recording:
             logger.warning("이미 녹음 중입니다")
             return False
         
         try:
             logger.info("🎤 녹음 시작... (버튼을 다시 누르면 종료)")
             
-            self.stream = self.pyaudio.open(
-                format=pyaudio.paInt16,
-                channels=self.channels,
-                rate=self.sample_rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
+            self._w = 0
+            
+            # 콜백 모드: PortAudio 스레드가 캡처 버퍼에 직접 기록
+            # 스트림은 처음 한 번만 열고 이후에는 시작/정지만 반복 (장치 초기화 생략)
+            if self.stream is None:
+                self.stream = self.pyaudio.open(
+                    format=pyaudio.paInt16,
+                    channels=self.channels,
+                    rate=self.sample_rate,
+                    input=True,
+                    frames_per_buffer=self.chunk,
+                    stream_callback=self._audio_callback,
+                    start=False
+                )
+            self.stream.start_stream()
             
-            self.frames = []
             self.is_recording = True
             return True
             
@@ -94,18 +199,31 @@ class GeminiAudioAgent:
             logger.error(f"녹음 시작 오류: {e}")
             return False
     
+    def _audio_callback(self, in_data, frame_count, time_info, status):
+        """PyAudio 스트림 콜백: 들어온 샘플을 캡처 버퍼에 복사"""
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        w = self._w
+        n = min(len(samples), len(self._ring) - w)
+        self._ring[w:w + n] = samples[:n]
+        self._w = w + n
+        
+        # 버퍼가 가득 차면 캡처 종료
+        if n < len(samples):
+            return (None, pyaudio.paComplete)
+        return (None, pyaudio.paContinue)
+    
     def record_chunk(self):
         """
-        녹음 중 한 청크 읽기 (메인 루프에서 호출)
-        """
-        if not self.is_recording or not self.stream:
-            return
+        녹음 진행 처리 (메인 루프에서 호출)
         
-        try:
-            data = self.stream.read(self.chunk, exception_on_overflow=False)
-            self.frames.append(data)
-        except Exception as e:
-            logger.error(f"녹음 청크 읽기 오류: {e}")
+        캡처는 스트림 콜백에서 진행되므로 여기서 할 일은 없습니다.
+        """
+        return
+    
+    def _upload_wav(self, wav_data: bytes):
+        """WAV 오디오를 압축해서 업로드 (블로킹)"""
+        data, mime_type = encode_wav(wav_data)
+        return genai.upload_file(io.BytesIO(data), mime_type=mime_type)
     
     def stop_recording(self) -> Optional[bytes]:
         """
@@ -123,25 +241,29 @@ class GeminiAudioAgent:
             
             if self.stream:
                 self.stream.stop_stream()
-                self.stream.close()
-                self.stream = None
             
-            if not self.frames:
+            w = self._w
+            if not w:
                 logger.warning("녹음된 데이터가 없습니다")
                 return None
             
-            # WAV 변환
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(self.pyaudio.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(self.frames))
+            if w == len(self._ring):
+                logger.warning(f"최대 녹음 길이({self.MAX_RECORD_SECONDS}초) 초과분은 잘렸습니다")
+            
+            # 앞뒤 무음 제거
+            start, end = voiced_range(self._ring[:w], self.sample_rate, self.channels)
+            if end <= start:
+                logger.warning("음성이 감지되지 않았습니다")
+                return None
+            
+            # WAV 변환 (헤더 + PCM)
+            wav_data = pcm_to_wav(self._ring[start:end], self.sample_rate, self.channels)
             
-            duration = len(self.frames) * self.chunk / self.sample_rate
-            logger.info(f"✓ 녹음 완료 ({duration:.1f}초)")
+            duration = (end - start) / (self.channels * self.sample_rate)
+            total = w / (self.channels * self.sample_rate)
+            logger.info(f"✓ 녹음 완료 ({duration:.1f}초 / 전체 {total:.1f}초)")
             
-            return wav_buffer.getvalue()
+            return wav_data
             
         except Exception as e:
             logger.error(f"녹음 종료 오류: {e}")
@@ -149,7 +271,7 @@ class GeminiAudioAgent:
     
     def process_audio_command(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
         """
-        오디오를 Gemini로 처리
+        오디오를 Gemini로 처리 (process_audio_command_async의 동기 래퍼)
         
         Args:
             audio_data: WAV 바이트
@@ -157,71 +279,172 @@ class GeminiAudioAgent:
         Returns:
             명령 딕셔너리
         """
+        return self._loop.run(self.process_audio_command_async(audio_data))
+    
+    def process_audio_commands(self, audio_batch: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """
+        여러 오디오를 Gemini로 처리 (배치 큐 사용)
+        
+        BATCH_MAX_SIZE개씩 묶어서 한 번의 요청으로 처리합니다.
+        
+        Args:
+            audio_batch: WAV 바이트 리스트
+            
+        Returns:
+            입력 순서대로 명령 딕셔너리 리스트
+        """
+        async def _gather():
+            return await asyncio.gather(
+                *[self.submit_audio_command(a) for a in audio_batch]
+            )
+        return self._loop.run(_gather())
+    
+    async def submit_audio_command(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        오디오 명령을 배치 큐에 넣고 결과를 기다립니다.
+        
+        BATCH_TIMEOUT 안에 들어온 명령들은 하나의 Gemini 요청으로 묶여 처리됩니다.
+        
+        Args:
+            audio_data: WAV 바이트
+            
+        Returns:
+            명령 딕셔너리
+        """
+        loop = asyncio.get_running_loop()
+        if self._batch_loop is not loop:
+            self._batch_loop = loop
+            self._batch_queue = asyncio.Queue()
+            self._batch_task = loop.create_task(self._batch_worker(self._batch_queue))
+        
+        future = loop.create_future()
+        await self._batch_queue.put((audio_data, future))
+        return await future
+    
+    async def _batch_worker(self, queue: asyncio.Queue):
+        """큐에서 최대 BATCH_MAX_SIZE개 또는 BATCH_TIMEOUT 동안 모아서 처리"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.BATCH_TIMEOUT
+            
+            while len(batch) < self.BATCH_MAX_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            audio_list = [audio for audio, _ in batch]
+            if len(audio_list) == 1:
+                results = [await self.process_audio_command_async(audio_list[0])]
+            else:
+                results = await self._process_audio_batch(audio_list)
+            
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    async def _process_audio_batch(self, audio_list: List[bytes]) -> List[Optional[Dict[str, Any]]]:
+        """
+        여러 오디오를 하나의 Gemini 요청으로 처리
+        
+        Returns:
+            입력 순서대로 명령 딕셔너리 리스트 (실패한 항목은 None)
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(audio_list)
         if not self.model:
             logger.error("Gemini API 사용 불가")
-            return None
+            return results
         
         try:
-            logger.info("🔄 Gemini 오디오 분석...")
+            logger.info(f"🔄 Gemini 오디오 배치 분석... ({len(audio_list)}개)")
             
-            prompt = """
-당신은 수학 그래프 시스템 음성 어시스턴트입니다.
-사용자 음성을 듣고 JSON으로 응답하세요.
-
-**명령 타입:**
-1. **그래프 추가** (수학 방정식)
-2. **그래프 삭제** (마지막 또는 전체)
-3. **그래프 토글** (특정 그래프 숨김/표시)
-
-**응답 형식:**
-
-그래프 추가:
-{
-  "action": "add_graph",
-  "name": "방정식 이름",
-  "equation_str": "수학 표현식",
-  "lambda_str": "lambda x: 파이썬 표현식"
-}
-
-예시:
-- "x 제곱" → {"action": "add_graph", "name": "제곱함수", "equation_str": "x²", "lambda_str": "lambda x: x**2"}
-- "사인 x" → {"action": "add_graph", "name": "사인함수", "equation_str": "sin(x)", "lambda_str": "lambda x: np.sin(x/50)*100"}
-
-그래프 삭제:
-{
-  "action": "delete_graph",
-  "mode": "last" 또는 "all"
-}
-
-그래프 토글:
-{
-  "action": "toggle_graph",
-  "index": 숫자 (1부터)
-}
-
-인식 불가:
-{
-  "action": "unknown"
-}
-
-주의: numpy 함수는 np. 접두사 필요 (np.sin, np.cos, np.tan, np.exp, np.log, np.sqrt)
-JSON만 출력하세요.
-"""
+            # 작으면 요청에 직접 포함, 크면 업로드 (모두 동시에 진행)
+            if sum(len(audio) for audio in audio_list) <= self.INLINE_AUDIO_MAX_BYTES:
+                audio_parts = await asyncio.gather(*[self._inline_audio(a) for a in audio_list])
+                audio_files = []
+            else:
+                audio_files = await asyncio.gather(*[
+                    asyncio.to_thread(self._upload_wav, audio)
+                    for audio in audio_list
+                ])
+                audio_parts = audio_files
             
-            # 오디오 파일 업로드
-            audio_file = genai.upload_file(
-                io.BytesIO(audio_data),
-                mime_type='audio/wav'
+            contents = [self._create_audio_prompt(len(audio_list))]
+            for i, audio_part in enumerate(audio_parts):
+                contents.extend([f"오디오 {i}:", audio_part])
+            
+            response = await self.model.generate_content_async(
+                contents,
+                generation_config=json_generation_config(BATCH_COMMAND_SCHEMA, len(audio_list))
             )
             
+            delete_tasks = [
+                asyncio.create_task(asyncio.to_thread(genai.delete_file, f.name))
+                for f in audio_files
+            ]
+            
+            # id로 각 호출자의 결과에 매칭 (lambda JIT 컴파일은 이벤트 루프 밖에서)
+            await warm_lambda_cache(response.text)
+            items = extract_json(response.text)
+            for item in items if isinstance(items, list) else []:
+                idx = item.get('id') if isinstance(item, dict) else None
+                if isinstance(idx, int) and 0 <= idx < len(results):
+                    results[idx] = self._parse_command(item)
+            
+            await asyncio.gather(*delete_tasks)
+            logger.info(f"✓ 배치 명령 인식: {sum(r is not None for r in results)}/{len(results)}")
+            
+        except Exception as e:
+            logger.error(f"Gemini 오디오 배치 처리 오류: {e}")
+        
+        return results
+    
+    async def process_audio_command_async(self, audio_data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        오디오를 Gemini로 처리 (비동기)
+        
+        Args:
+            audio_data: WAV 바이트
+            
+        Returns:
+            명령 딕셔너리
+        """
+        if not self.model:
+            logger.error("Gemini API 사용 불가")
+            return None
+        
+        try:
+            logger.info("🔄 Gemini 오디오 분석...")
+            
+            # 작은 오디오는 요청에 직접 포함 (업로드/삭제 왕복 생략)
+            if len(audio_data) <= self.INLINE_AUDIO_MAX_BYTES:
+                audio_parts = [await self._inline_audio(audio_data)]
+                audio_files = []
+            else:
+                # 블로킹 호출이므로 스레드에서 실행
+                audio_files = [await asyncio.to_thread(self._upload_wav, audio_data)]
+                audio_parts = audio_files
+            
             # Gemini 요청
-            response = self.model.generate_content([prompt, audio_file])
+            response = await self.model.generate_content_async(
+                [self._create_audio_prompt(), *audio_parts],
+                generation_config=json_generation_config(COMMAND_SCHEMA)
+            )
             
-            # 파일 삭제
-            genai.delete_file(audio_file.name)
+            # 파일 삭제는 응답 파싱과 겹쳐서 백그라운드로 진행
+            delete_tasks = [
+                asyncio.create_task(asyncio.to_thread(genai.delete_file, f.name))
+                for f in audio_files
+            ]
             
-            # 파싱
+            # 파싱 (lambda JIT 컴파일은 이벤트 루프 밖에서)
+            await warm_lambda_cache(response.text)
             result = self._parse_response(response.text)
+            await asyncio.gather(*delete_tasks)
             
             if result:
                 logger.info(f"✓ 명령 인식: {result['action']}")
@@ -234,40 +457,60 @@ JSON만 출력하세요.
             logger.error(f"Gemini 오디오 처리 오류: {e}")
             return None
     
+    async def _inline_audio(self, audio_data: bytes) -> Dict[str, Any]:
+        """요청에 직접 포함할 오디오 파트 (압축 인코딩은 스레드에서)"""
+        data, mime_type = await asyncio.to_thread(encode_wav, audio_data)
+        return {'mime_type': mime_type, 'data': data}
+    
+    def _create_audio_prompt(self, batch_size: int = 1) -> str:
+        """
+        요청별 프롬프트 생성 (공통 지시 AUDIO_PROMPT는 system_instruction)
+        
+        batch_size > 1이면 배치 응답 형식을 추가합니다.
+        """
+        if batch_size > 1:
+            return BATCH_PROMPT_SUFFIX.format(count=batch_size)
+        return "이 음성 명령을 해석하세요."
+    
     def _parse_response(self, response_text: str) -> Optional[Dict[str, Any]]:
         """응답 파싱"""
         try:
-            # JSON 추출
-            json_text = response_text.strip()
-            if '```json' in json_text:
-                json_text = json_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in json_text:
-                json_text = json_text.split('```')[1].split('```')[0].strip()
-            
-            data = json.loads(json_text)
+            data = extract_json(response_text)
+            if not isinstance(data, dict):
+                logger.warning("JSON 형식을 찾을 수 없습니다")
+                return None
+            return self._parse_command(data)
+        except Exception as e:
+            logger.error(f"파싱 오류: {e}")
+            return None
+    
+    def _parse_command(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """JSON 명령 하나를 명령 딕셔너리로 변환"""
+        try:
             action = data.get('action', 'unknown')
             
             if action == 'add_graph':
                 # Lambda 함수 생성
                 lambda_str = data.get('lambda_str', 'lambda x: x')
                 try:
-                    func = eval(lambda_str, {'np': np, '__builtins__': {}})
+                    func = compile_lambda(lambda_str)
                     
-                    # 색상 생성
-                    import colorsys
-                    hue = (len(self.equation_history) * 0.17) % 1.0
-                    rgb = colorsys.hsv_to_rgb(hue, 0.8, 0.9)
-                    color = tuple(int(c * 255) for c in rgb)
+                    # 색상 생성 (히스토리 기반 팔레트)
+                    color = self.equation_store.next_color()
                     
                     result = {
                         'action': 'add_graph',
                         'name': data.get('name', '새 그래프'),
                         'equation_str': data.get('equation_str', 'f(x)'),
+                        'lambda_str': lambda_str,
                         'function': func,
                         'color': color
                     }
                     
-                    self.equation_history.append(result)
+                    self.equation_store.add(
+                        result['name'], result['equation_str'], func,
+                        color=color, lambda_str=lambda_str
+                    )
                     return result
                     
                 except Exception as e:
@@ -297,5 +540,7 @@ JSON만 출력하세요.
         """리소스 정리"""
         if self.is_recording:
             self.stop_recording()
-        if self.pyaudio:
-            self.pyaudio.terminate()
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self._loop.close()
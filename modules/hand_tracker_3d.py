@@ -4,6 +4,8 @@
 Mediapipe를 사용하여 스테레오 카메라로부터 실시간으로 손의 3D 위치를 추적합니다.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from itertools import permutations
 import cv2
 import numpy as np
 import mediapipe as mp
@@ -22,12 +24,23 @@ class HandTracker3D:
     스테레오 비전을 통해 3D 좌표를 계산합니다.
     """
 
+    # 손가락 이름과 끝/기저부 랜드마크 인덱스 (엄지는 CMC를 기저부로 사용)
+    FINGER_NAMES = ("THUMB", "INDEX", "MIDDLE", "RING", "PINKY")
+    FINGERTIP_IDX = np.array([4, 8, 12, 16, 20])
+    FINGER_BASE_IDX = np.array([1, 5, 9, 13, 17])
+
+    # 스테레오 손 매칭: 손목 y 차이 허용치 (정규화 좌표), handedness가 다른 짝의 벌점
+    MATCH_MAX_WRIST_DY = 0.1
+    LABEL_MISMATCH_PENALTY = 10.0
+
     def __init__(
         self,
         stereo_calib,
         max_num_hands: int = 2,
         min_detection_confidence: float = 0.5,
         min_tracking_confidence: float = 0.5,
+        use_opencl: bool = False,
+        infer_width: int = 640,
     ):
         """
         Args:
@@ -35,9 +48,28 @@ class HandTracker3D:
             max_num_hands: 감지할 최대 손 개수
             min_detection_confidence: 손 감지 최소 신뢰도
             min_tracking_confidence: 손 추적 최소 신뢰도
+            use_opencl: rectify/축소를 OpenCL(T-API, cv2.UMat)로 처리할지 여부
+            infer_width: Mediapipe 입력 최대 너비 (더 넓은 프레임은 비율을 유지해 축소, 0이면 원본)
         """
         self.stereo_calib = stereo_calib
         self.max_num_hands = max_num_hands
+        self.infer_width = infer_width
+
+        # OpenCL 사용 가능 시 UMat 경로 활성화 (라즈베리파이 5 VideoCore GPU)
+        self.use_opencl = use_opencl and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            logger.info("OpenCL(T-API) 가속 활성화")
+        elif use_opencl:
+            logger.warning("OpenCL을 사용할 수 없습니다. CPU로 처리합니다.")
+
+        # 삼각측량용 Q 전치 행렬 (캘리브레이션이 나중에 로드되면 첫 사용 시 생성)
+        self._Q_T = None
+        if self.stereo_calib.Q is not None:
+            self._Q_T = np.ascontiguousarray(self.stereo_calib.Q.T, dtype=np.float32)
+
+        # 고정소수점(CV_16SC2) rectification 맵 (캘리브레이션이 나중에 로드되면 첫 사용 시 생성)
+        self._rect_maps = self._build_rect_maps()
 
         # Mediapipe Hands 초기화
         self.mp_hands = mp.solutions.hands
@@ -58,6 +90,9 @@ class HandTracker3D:
             min_tracking_confidence=min_tracking_confidence,
         )
 
+        # 오른쪽 카메라 추론용 워커 (Mediapipe 추론 중에는 GIL이 풀려 양쪽이 병렬로 실행됨)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hands-right")
+
         # 손가락 관절 이름 (Mediapipe 순서)
         self.landmark_names = [
             "WRIST",
@@ -101,198 +136,279 @@ class HandTracker3D:
             3D 손 데이터 형식:
             {
                 'handedness': 'Left' 또는 'Right',
-                'landmarks_3d': [(x, y, z), ...],  # 21개 랜드마크의 3D 좌표 (mm)
-                'landmarks_2d_left': [(x, y), ...],  # 왼쪽 이미지의 2D 좌표
-                'landmarks_2d_right': [(x, y), ...],  # 오른쪽 이미지의 2D 좌표
+                'landmarks_3d': (21, 3) ndarray,  # 21개 랜드마크의 3D 좌표 (mm)
+                'landmarks_2d_left': (21, 2) ndarray,  # 왼쪽 이미지의 2D 좌표
+                'landmarks_2d_right': (21, 2) ndarray,  # 오른쪽 이미지의 2D 좌표
                 'confidence': float  # 감지 신뢰도
             }
         """
-        # 이미지를 rectify
-        rect_left, rect_right = self.stereo_calib.rectify_images(
-            frame_left, frame_right
-        )
+        # Mediapipe 입력 크기 (출력 랜드마크는 정규화 좌표라 원본 크기로 그대로 환산됨)
+        frame_h, frame_w = frame_left.shape[:2]
+        infer_size = None
+        if 0 < self.infer_width < frame_w:
+            infer_size = (self.infer_width, round(frame_h * self.infer_width / frame_w))
+
+        # OpenCL 경로: UMat으로 감싸면 remap/resize가 GPU에서 수행됨
+        if self.use_opencl:
+            frame_left = cv2.UMat(frame_left)
+            frame_right = cv2.UMat(frame_right)
+
+        # 이미지를 rectify (고정소수점 맵으로 직접 remap, 결과는 새 버퍼)
+        if self._rect_maps is None:
+            self._rect_maps = self._build_rect_maps()
+
+        if self._rect_maps is not None:
+            m1l, m2l, m1r, m2r = self._rect_maps
+            rect_left = cv2.remap(frame_left, m1l, m2l, cv2.INTER_LINEAR)
+            rect_right = cv2.remap(frame_right, m1r, m2r, cv2.INTER_LINEAR)
+        else:
+            rect_left, rect_right = self.stereo_calib.rectify_images(
+                frame_left, frame_right
+            )
+
+        # Mediapipe 입력용 축소 (Mediapipe는 내부적으로 어차피 256x256으로 줄임)
+        small_left, small_right = rect_left, rect_right
+        if infer_size is not None:
+            small_left = cv2.resize(rect_left, infer_size, interpolation=cv2.INTER_AREA)
+            small_right = cv2.resize(rect_right, infer_size, interpolation=cv2.INTER_AREA)
+
+        # Mediapipe와 시각화는 numpy 배열이 필요하므로 여기서 한 번만 내려받음
+        if self.use_opencl:
+            rect_left, rect_right = rect_left.get(), rect_right.get()
+            if infer_size is not None:
+                small_left, small_right = small_left.get(), small_right.get()
+            else:
+                small_left, small_right = rect_left, rect_right
 
-        # RGB로 변환 (Mediapipe 입력)
-        rgb_left = cv2.cvtColor(rect_left, cv2.COLOR_BGR2RGB)
-        rgb_right = cv2.cvtColor(rect_right, cv2.COLOR_BGR2RGB)
+        # RGB로 변환: 채널 역순 뷰를 연속 배열로 한 번만 복사 (축소된 프레임 기준)
+        rgb_left = np.ascontiguousarray(small_left[:, :, ::-1])
+        rgb_right = np.ascontiguousarray(small_right[:, :, ::-1])
 
-        # 손 감지 수행
+        # 손 감지 수행 (오른쪽은 워커 스레드, 왼쪽은 현재 스레드에서 동시에)
+        # 이전 프레임 손 영역 추적은 Mediapipe 추적 모드가 내부에서 처리
+        future_right = self._pool.submit(self.hands_right.process, rgb_right)
         results_left = self.hands_left.process(rgb_left)
-        results_right = self.hands_right.process(rgb_right)
+        results_right = future_right.result()
 
         hands_3d = []
 
-        # 시각화용 프레임 복사
-        output_left = rect_left.copy()
-        output_right = rect_right.copy()
+        # 시각화용 프레임 복사 (remap 결과와 UMat.get()은 이미 새 배열이므로 복사 생략,
+        # rectify가 안 되어 입력 프레임이 그대로 온 경우에만 복사)
+        if self.use_opencl or self._rect_maps is not None:
+            output_left, output_right = rect_left, rect_right
+        else:
+            output_left = rect_left.copy()
+            output_right = rect_right.copy()
 
         # 양쪽 카메라에서 손이 감지된 경우
         if results_left.multi_hand_landmarks and results_right.multi_hand_landmarks:
-            # 각 손에 대해 매칭 시도
-            for idx_left, (hand_landmarks_left, handedness_left) in enumerate(
-                zip(results_left.multi_hand_landmarks, results_left.multi_handedness)
+            # 랜드마크를 한 번만 (N, 21, 3) 배열로 변환해 매칭/2D/3D 계산에 재사용
+            lms_left = np.stack(
+                [self._lm_to_array(h) for h in results_left.multi_hand_landmarks]
+            )
+            lms_right = np.stack(
+                [self._lm_to_array(h) for h in results_right.multi_hand_landmarks]
+            )
+            labels_left = [
+                h.classification[0].label for h in results_left.multi_handedness
+            ]
+            labels_right = [
+                h.classification[0].label for h in results_right.multi_handedness
+            ]
+
+            # 왼쪽/오른쪽 손 짝 찾기 (한 오른쪽 손이 두 번 쓰이지 않음)
+            for idx_left, idx_right in self._pair_hands(
+                lms_left, labels_left, lms_right, labels_right
             ):
-                # 가장 유사한 오른쪽 손 찾기
-                best_match_idx = self._find_matching_hand(
-                    hand_landmarks_left, results_right.multi_hand_landmarks
+                hand_landmarks_left = results_left.multi_hand_landmarks[idx_left]
+                hand_landmarks_right = results_right.multi_hand_landmarks[idx_right]
+                handedness_left = results_left.multi_handedness[idx_left]
+                lm_left, lm_right = lms_left[idx_left], lms_right[idx_right]
+
+                # 3D 좌표 계산
+                landmarks_3d = self._triangulate_landmarks(
+                    lm_left, lm_right, rect_left.shape
                 )
 
-                if best_match_idx is not None:
-                    hand_landmarks_right = results_right.multi_hand_landmarks[
-                        best_match_idx
-                    ]
-
-                    # 3D 좌표 계산
-                    landmarks_3d = self._triangulate_landmarks(
-                        hand_landmarks_left, hand_landmarks_right, rect_left.shape
+                if landmarks_3d is not None:
+                    hand_data = {
+                        "handedness": handedness_left.classification[0].label,
+                        "landmarks_3d": landmarks_3d,
+                        "landmarks_2d_left": self._extract_2d_landmarks(
+                            lm_left, rect_left.shape
+                        ),
+                        "landmarks_2d_right": self._extract_2d_landmarks(
+                            lm_right, rect_right.shape
+                        ),
+                        "confidence": handedness_left.classification[0].score,
+                    }
+                    hands_3d.append(hand_data)
+
+                    # 시각화
+                    self.mp_drawing.draw_landmarks(
+                        output_left,
+                        hand_landmarks_left,
+                        self.mp_hands.HAND_CONNECTIONS,
+                        self.mp_drawing_styles.get_default_hand_landmarks_style(),
+                        self.mp_drawing_styles.get_default_hand_connections_style(),
                     )
 
-                    if landmarks_3d is not None:
-                        hand_data = {
-                            "handedness": handedness_left.classification[0].label,
-                            "landmarks_3d": landmarks_3d,
-                            "landmarks_2d_left": self._extract_2d_landmarks(
-                                hand_landmarks_left, rect_left.shape
-                            ),
-                            "landmarks_2d_right": self._extract_2d_landmarks(
-                                hand_landmarks_right, rect_right.shape
-                            ),
-                            "confidence": handedness_left.classification[0].score,
-                        }
-                        hands_3d.append(hand_data)
-
-                        # 시각화
-                        self.mp_drawing.draw_landmarks(
-                            output_left,
-                            hand_landmarks_left,
-                            self.mp_hands.HAND_CONNECTIONS,
-                            self.mp_drawing_styles.get_default_hand_landmarks_style(),
-                            self.mp_drawing_styles.get_default_hand_connections_style(),
-                        )
-
-                        self.mp_drawing.draw_landmarks(
-                            output_right,
-                            hand_landmarks_right,
-                            self.mp_hands.HAND_CONNECTIONS,
-                            self.mp_drawing_styles.get_default_hand_landmarks_style(),
-                            self.mp_drawing_styles.get_default_hand_connections_style(),
-                        )
+                    self.mp_drawing.draw_landmarks(
+                        output_right,
+                        hand_landmarks_right,
+                        self.mp_hands.HAND_CONNECTIONS,
+                        self.mp_drawing_styles.get_default_hand_landmarks_style(),
+                        self.mp_drawing_styles.get_default_hand_connections_style(),
+                    )
 
         return hands_3d, output_left, output_right
 
-    def _extract_2d_landmarks(
-        self, hand_landmarks, image_shape: Tuple[int, int, int]
-    ) -> List[Tuple[float, float]]:
+    def _build_rect_maps(self) -> Optional[Tuple]:
         """
-        Mediapipe 랜드마크를 픽셀 좌표로 변환합니다.
+        캘리브레이션의 rectification 맵을 고정소수점 형식으로 변환합니다.
 
-        Args:
-            hand_landmarks: Mediapipe hand landmarks
-            image_shape: 이미지 크기 (height, width, channels)
+        CV_16SC2 + CV_16UC1 맵은 float 맵보다 작아서 remap의 메모리 접근이 줄어듭니다.
+        OpenCL 경로에서는 맵을 UMat으로 한 번만 올려둡니다.
 
         Returns:
-            [(x, y), ...] 픽셀 좌표 리스트
+            (map1_left, map2_left, map1_right, map2_right) 또는 None (맵 없음)
         """
-        h, w = image_shape[:2]
-        landmarks_2d = []
+        calib = self.stereo_calib
+        if calib.map1_left is None or calib.map1_right is None:
+            return None
 
-        for landmark in hand_landmarks.landmark:
-            x = landmark.x * w
-            y = landmark.y * h
-            landmarks_2d.append((x, y))
+        maps = []
+        for map1, map2 in (
+            (calib.map1_left, calib.map2_left),
+            (calib.map1_right, calib.map2_right),
+        ):
+            if map1.dtype != np.int16:
+                map1, map2 = cv2.convertMaps(map1, map2, cv2.CV_16SC2)
+            maps.extend((map1, map2))
 
-        return landmarks_2d
+        if self.use_opencl:
+            maps = [cv2.UMat(m) for m in maps]
 
-    def _find_matching_hand(self, hand_left, hands_right: List) -> Optional[int]:
+        return tuple(maps)
+
+    @staticmethod
+    def _lm_to_array(hand_landmarks) -> np.ndarray:
         """
-        왼쪽 카메라의 손과 가장 유사한 오른쪽 카메라의 손을 찾습니다.
+        Mediapipe 랜드마크를 정규화 좌표 배열로 변환합니다.
 
         Args:
-            hand_left: 왼쪽 카메라의 손 랜드마크
-            hands_right: 오른쪽 카메라의 손 랜드마크 리스트
+            hand_landmarks: Mediapipe hand landmarks
 
         Returns:
-            가장 유사한 손의 인덱스 (None이면 매칭 실패)
+            (21, 3) float32 배열 (x, y, z)
         """
-        if not hands_right:
-            return None
+        return np.array(
+            [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32
+        )
 
-        # 손목(WRIST) 위치를 기준으로 y 좌표가 유사한 손을 찾음
-        wrist_y_left = hand_left.landmark[0].y
+    def _extract_2d_landmarks(
+        self, landmarks: np.ndarray, image_shape: Tuple[int, int, int]
+    ) -> np.ndarray:
+        """
+        정규화 랜드마크를 픽셀 좌표로 변환합니다.
 
-        min_diff = float("inf")
-        best_idx = None
+        Args:
+            landmarks: _lm_to_array로 변환한 (21, 3) 랜드마크 배열
+            image_shape: 이미지 크기 (height, width, channels)
 
-        for idx, hand_right in enumerate(hands_right):
-            wrist_y_right = hand_right.landmark[0].y
-            diff = abs(wrist_y_left - wrist_y_right)
+        Returns:
+            (21, 2) 픽셀 좌표 배열 (x, y)
+        """
+        h, w = image_shape[:2]
+        return landmarks[:, :2] * np.array([w, h], dtype=np.float32)
 
-            if diff < min_diff:
-                min_diff = diff
-                best_idx = idx
+    def _pair_hands(
+        self,
+        lms_left: np.ndarray,
+        labels_left: List[str],
+        lms_right: np.ndarray,
+        labels_right: List[str],
+    ) -> List[Tuple[int, int]]:
+        """
+        왼쪽/오른쪽 카메라에서 감지된 손들을 짝지어줍니다.
 
-        # y 좌표 차이가 0.1 (정규화 좌표) 이하인 경우만 매칭으로 인정
-        if min_diff < 0.1:
-            return best_idx
+        손목(WRIST) y 좌표 차이로 (Nl, Nr) 비용 행렬을 만들고, 총비용이 최소인
+        일대일 짝을 찾습니다. 같은 손은 양쪽 카메라에서 같은 handedness로 감지되므로
+        라벨이 다른 짝에는 큰 벌점을 줍니다. 손 개수가 max_num_hands(보통 2) 이하라
+        가능한 짝을 모두 비교합니다.
 
-        return None
+        Args:
+            lms_left: 왼쪽 카메라의 (Nl, 21, 3) 랜드마크 배열
+            labels_left: 왼쪽 손들의 handedness 리스트
+            lms_right: 오른쪽 카메라의 (Nr, 21, 3) 랜드마크 배열
+            labels_right: 오른쪽 손들의 handedness 리스트
+
+        Returns:
+            [(왼쪽 인덱스, 오른쪽 인덱스), ...] (왼쪽 인덱스 순)
+        """
+        cost = np.abs(lms_left[:, 0, 1, None] - lms_right[None, :, 0, 1])
+        mismatch = np.array(labels_left)[:, None] != np.array(labels_right)[None, :]
+        score = cost + mismatch * self.LABEL_MISMATCH_PENALTY
+
+        # 짧은 쪽의 각 손에 긴 쪽의 서로 다른 손을 배정하는 모든 경우 중 최소 비용
+        transpose = score.shape[0] > score.shape[1]
+        if transpose:
+            score = score.T
+        rows = np.arange(score.shape[0])
+        cols = min(
+            permutations(range(score.shape[1]), score.shape[0]),
+            key=lambda c: score[rows, c].sum(),
+        )
+        pairs = zip(cols, rows) if transpose else zip(rows, cols)
+
+        # y 좌표 차이가 0.1 (정규화 좌표) 이하인 경우만 매칭으로 인정
+        return sorted(
+            (int(i), int(j)) for i, j in pairs if cost[i, j] < self.MATCH_MAX_WRIST_DY
+        )
 
     def _triangulate_landmarks(
-        self, landmarks_left, landmarks_right, image_shape: Tuple[int, int, int]
-    ) -> Optional[List[Tuple[float, float, float]]]:
+        self,
+        landmarks_left: np.ndarray,
+        landmarks_right: np.ndarray,
+        image_shape: Tuple[int, int, int],
+    ) -> Optional[np.ndarray]:
         """
         스테레오 삼각측량을 통해 3D 좌표를 계산합니다.
 
         Args:
-            landmarks_left: 왼쪽 카메라의 손 랜드마크
-            landmarks_right: 오른쪽 카메라의 손 랜드마크
+            landmarks_left: 왼쪽 카메라의 (21, 3) 랜드마크 배열
+            landmarks_right: 오른쪽 카메라의 (21, 3) 랜드마크 배열
             image_shape: 이미지 크기
 
         Returns:
-            [(x, y, z), ...] 3D 좌표 리스트 (mm 단위) 또는 None
+            (21, 3) 3D 좌표 배열 (mm 단위) 또는 None
         """
-        if self.stereo_calib.Q is None:
-            logger.error("캘리브레이션 데이터가 없습니다.")
-            return None
+        if self._Q_T is None:
+            if self.stereo_calib.Q is None:
+                logger.error("캘리브레이션 데이터가 없습니다.")
+                return None
+            self._Q_T = np.ascontiguousarray(self.stereo_calib.Q.T, dtype=np.float32)
 
         h, w = image_shape[:2]
-        landmarks_3d = []
-
-        for lm_left, lm_right in zip(landmarks_left.landmark, landmarks_right.landmark):
-            # 픽셀 좌표로 변환
-            x_left = lm_left.x * w
-            y_left = lm_left.y * h
-            x_right = lm_right.x * w
-            # y_right = lm_right.y * h  # disparity 계산에는 x만 사용
-
-            # Disparity 계산
-            disparity = x_left - x_right
-
-            if abs(disparity) < 1.0:  # disparity가 너무 작으면 스킵
-                landmarks_3d.append((0.0, 0.0, 0.0))
-                continue
-
-            # 3D 좌표 재구성
-            # Q 행렬을 사용한 역투영
-            point_3d = cv2.perspectiveTransform(
-                np.array([[[x_left, y_left, disparity]]], dtype=np.float32),
-                self.stereo_calib.Q,
-            )[0][0]
-
-            # 동차 좌표를 일반 좌표로 변환
-            if point_3d[3] != 0:
-                x = point_3d[0] / point_3d[3]
-                y = point_3d[1] / point_3d[3]
-                z = point_3d[2] / point_3d[3]
-                landmarks_3d.append((float(x), float(y), float(z)))
-            else:
-                landmarks_3d.append((0.0, 0.0, 0.0))
 
-        return landmarks_3d
+        # 21개 랜드마크를 (x, y, disparity, 1) 동차 좌표로 한 번에 구성
+        hom = np.ones((len(landmarks_left), 4), dtype=np.float32)
+        hom[:, 0] = landmarks_left[:, 0] * w
+        hom[:, 1] = landmarks_left[:, 1] * h
+        hom[:, 2] = hom[:, 0] - landmarks_right[:, 0] * w
+
+        # Q 행렬을 사용한 역투영 (perspectiveTransform 21회 대신 행렬곱 1회)
+        out = hom @ self._Q_T
+        w_h = out[:, 3:4]
 
-    def get_fingertip_positions(
-        self, hand_data: Dict
-    ) -> Dict[str, Tuple[float, float, float]]:
+        # 동차 좌표 나눗셈 (disparity가 너무 작거나 w가 0인 행은 (0, 0, 0))
+        valid = (np.abs(hom[:, 2:3]) >= 1.0) & (w_h != 0)
+        xyz = np.zeros((len(hom), 3), dtype=np.float32)
+        np.divide(out[:, :3], w_h, out=xyz, where=valid)
+
+        return xyz
+
+    def get_fingertip_positions(self, hand_data: Dict) -> Dict[str, np.ndarray]:
         """
         손가락 끝의 3D 위치를 추출합니다.
 
@@ -300,25 +416,12 @@ class HandTracker3D:
             hand_data: process_frame에서 반환된 손 데이터
 
         Returns:
-            {'THUMB': (x, y, z), 'INDEX': (x, y, z), ...}
+            {'THUMB': [x, y, z], 'INDEX': [x, y, z], ...} (각 값은 (3,) 배열)
         """
-        fingertip_indices = {
-            "THUMB": 4,
-            "INDEX": 8,
-            "MIDDLE": 12,
-            "RING": 16,
-            "PINKY": 20,
-        }
-
-        fingertips = {}
-        landmarks_3d = hand_data["landmarks_3d"]
-
-        for finger_name, idx in fingertip_indices.items():
-            fingertips[finger_name] = landmarks_3d[idx]
+        fingertips = hand_data["landmarks_3d"][self.FINGERTIP_IDX]
+        return dict(zip(self.FINGER_NAMES, fingertips))
 
-        return fingertips
-
-    def get_wrist_position(self, hand_data: Dict) -> Tuple[float, float, float]:
+    def get_wrist_position(self, hand_data: Dict) -> np.ndarray:
         """
         손목의 3D 위치를 반환합니다.
 
@@ -326,10 +429,35 @@ class HandTracker3D:
             hand_data: process_frame에서 반환된 손 데이터
 
         Returns:
-            (x, y, z) 손목 좌표 (mm)
+            [x, y, z] 손목 좌표 (mm, (3,) 배열)
         """
         return hand_data["landmarks_3d"][0]
 
+    def is_fingers_extended(self, hand_data: Dict) -> Dict[str, bool]:
+        """
+        다섯 손가락이 펴져있는지 한 번에 판단합니다.
+
+        Args:
+            hand_data: process_frame에서 반환된 손 데이터
+
+        Returns:
+            {'THUMB': bool, 'INDEX': bool, ...}
+        """
+        landmarks_3d = hand_data["landmarks_3d"]
+        tips = landmarks_3d[self.FINGERTIP_IDX]
+        bases = landmarks_3d[self.FINGER_BASE_IDX]
+
+        # 다른 손가락은 끝이 기저부보다 위에 있는지 확인 (y축이 아래로 향하므로)
+        extended = tips[:, 1] < bases[:, 1]
+
+        # 엄지는 x 좌표로 비교 (다른 방향)
+        if hand_data["handedness"] == "Right":
+            extended[0] = tips[0, 0] > bases[0, 0]
+        else:
+            extended[0] = tips[0, 0] < bases[0, 0]
+
+        return dict(zip(self.FINGER_NAMES, extended.tolist()))
+
     def is_finger_extended(self, hand_data: Dict, finger: str) -> bool:
         """
         특정 손가락이 펴져있는지 판단합니다.
@@ -341,39 +469,14 @@ class HandTracker3D:
         Returns:
             손가락이 펴져있으면 True
         """
-        finger_indices = {
-            "THUMB": [1, 2, 3, 4],
-            "INDEX": [5, 6, 7, 8],
-            "MIDDLE": [9, 10, 11, 12],
-            "RING": [13, 14, 15, 16],
-            "PINKY": [17, 18, 19, 20],
-        }
-
-        if finger not in finger_indices:
+        if finger not in self.FINGER_NAMES:
             return False
 
-        indices = finger_indices[finger]
-        landmarks_3d = hand_data["landmarks_3d"]
-
-        # 손가락 관절들의 z 좌표를 비교
-        # 엄지는 x 좌표로 비교 (다른 방향)
-        if finger == "THUMB":
-            handedness = hand_data["handedness"]
-            tip_x = landmarks_3d[indices[-1]][0]
-            base_x = landmarks_3d[indices[0]][0]
-
-            if handedness == "Right":
-                return tip_x > base_x
-            else:
-                return tip_x < base_x
-        else:
-            # 다른 손가락은 끝이 기저부보다 멀리 있는지 확인
-            tip_y = landmarks_3d[indices[-1]][1]
-            base_y = landmarks_3d[indices[0]][1]
-            return tip_y < base_y  # y축이 아래로 향하므로
+        return self.is_fingers_extended(hand_data)[finger]
 
     def close(self):
         """리소스를 해제합니다."""
+        self._pool.shutdown(wait=True)
         self.hands_left.close()
         self.hands_right.close()
         logger.info("HandTracker3D 종료")
@@ -6,8 +6,10 @@ GPIO 모터 제어 모듈
 """
 
 import time
+from collections import namedtuple
 from typing import Optional, Dict
 import logging
+import numpy as np
 
 try:
     import lgpio
@@ -17,6 +19,22 @@ except (ImportError, RuntimeError):
     GPIO_AVAILABLE = False
     logging.warning("lgpio를 사용할 수 없습니다. 시뮬레이션 모드로 동작합니다.")
 
+# 하드웨어 타이밍 펄스열 지원 여부 (없으면 소프트웨어 루프로 스텝 생성)
+TX_PULSE_AVAILABLE = GPIO_AVAILABLE and hasattr(lgpio, "tx_pulse")
+
+# 모터별 핀 번호와 상태 딕셔너리 참조 (초기화 시 한 번 만들어 매 호출의 조회를 줄임)
+# dir_shift: 방향 핀 그룹에서 IN1의 비트 위치 (IN2는 그 다음 비트)
+MotorHandle = namedtuple(
+    "MotorHandle", ["enable_pin", "in1_pin", "in2_pin", "dir_shift", "state"]
+)
+
+# 방향 -> (IN1, IN2) 출력값
+_DIR_MAP = {
+    "forward": (1, 0),
+    "backward": (0, 1),
+    "stop": (0, 0),
+}
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -63,12 +81,30 @@ class MotorController:
         # 모터 상태 저장
         self.motor_states: Dict[str, Dict] = {}
 
+        # 시간 제한 동작의 종료 시각 (time.monotonic 기준)
+        self._deadlines: Dict[str, float] = {}
+
+        # 모든 모터의 방향 핀(IN1, IN2 순서)을 묶은 GPIO 그룹 (리더 핀 번호, 전체 마스크)
+        self._dir_group: Optional[int] = None
+        self._dir_mask = 0
+
         if not self.simulation_mode:
             self._setup_gpio()
         else:
             logger.warning("시뮬레이션 모드로 동작합니다.")
             self._setup_simulation()
 
+        self._motors: Dict[str, MotorHandle] = {
+            name: MotorHandle(
+                config.get("enable_pin"),
+                config.get("in1_pin"),
+                config.get("in2_pin"),
+                2 * i,
+                self.motor_states[name],
+            )
+            for i, (name, config) in enumerate(self.motor_configs.items())
+        }
+
         logger.info(f"MotorController 초기화 완료 ({len(motor_configs)}개 모터)")
 
     def _setup_gpio(self):
@@ -77,23 +113,19 @@ class MotorController:
             # lgpio 핸들 열기 (gpiochip4는 라즈베리파이 5용)
             self.handle = lgpio.gpiochip_open(4)
 
+            dir_pins = []
             for motor_name, config in self.motor_configs.items():
                 enable_pin = config["enable_pin"]
                 in1_pin = config["in1_pin"]
                 in2_pin = config["in2_pin"]
+                dir_pins.extend((in1_pin, in2_pin))
 
                 # 핀을 출력으로 설정
                 lgpio.gpio_claim_output(self.handle, enable_pin)
-                lgpio.gpio_claim_output(self.handle, in1_pin)
-                lgpio.gpio_claim_output(self.handle, in2_pin)
 
                 # PWM 설정 (초기 duty cycle 0%)
                 lgpio.tx_pwm(self.handle, enable_pin, self.pwm_frequency, 0)
-                
-                # 방향 핀 초기화
-                lgpio.gpio_write(self.handle, in1_pin, 0)
-                lgpio.gpio_write(self.handle, in2_pin, 0)
-                
+
                 self.pwm_objects[motor_name] = enable_pin  # PWM 핀 번호 저장
 
                 # 초기 상태
@@ -106,10 +138,35 @@ class MotorController:
                 logger.info(
                     f"모터 '{motor_name}' GPIO 설정 완료 (Enable: {enable_pin}, IN1: {in1_pin}, IN2: {in2_pin})"
                 )
+
+            self._setup_direction_pins(dir_pins)
         except Exception as e:
             logger.error(f"GPIO 초기화 실패: {e}")
             raise
 
+    def _setup_direction_pins(self, dir_pins: list):
+        """
+        방향 핀을 하나의 GPIO 그룹으로 묶어 출력으로 설정합니다 (초기값 0).
+
+        그룹으로 묶으면 group_write 한 번으로 여러 핀을 동시에 바꿀 수 있습니다.
+        그룹을 만들 수 없으면 (핀 중복 등) 핀별로 설정합니다.
+
+        Args:
+            dir_pins: [motor1 IN1, motor1 IN2, motor2 IN1, ...]
+        """
+        if not dir_pins:
+            return
+
+        try:
+            lgpio.group_claim_output(self.handle, dir_pins, [0] * len(dir_pins))
+            self._dir_group = dir_pins[0]
+            self._dir_mask = (1 << len(dir_pins)) - 1
+        except Exception as e:
+            logger.warning(f"방향 핀 그룹 설정 실패, 핀별로 설정합니다: {e}")
+            for pin in dir_pins:
+                lgpio.gpio_claim_output(self.handle, pin)
+                lgpio.gpio_write(self.handle, pin, 0)
+
     def _setup_simulation(self):
         """시뮬레이션 모드를 초기화합니다."""
         for motor_name in self.motor_configs.keys():
@@ -121,7 +178,11 @@ class MotorController:
             }
 
     def set_motor_speed(
-        self, motor_name: str, speed: float, direction: str = "forward"
+        self,
+        motor_name: str,
+        speed: float,
+        direction: str = "forward",
+        pulse_cycles: int = 0,
     ) -> bool:
         """
         모터의 속도와 방향을 설정합니다.
@@ -130,11 +191,13 @@ class MotorController:
             motor_name: 모터 이름
             speed: 속도 (0.0 ~ 100.0 %)
             direction: 방향 ('forward', 'backward', 'stop')
+            pulse_cycles: PWM 펄스 수 (이만큼 출력 후 하드웨어가 멈춤, 0이면 계속 출력)
 
         Returns:
             설정 성공 여부
         """
-        if motor_name not in self.motor_configs:
+        motor = self._motors.get(motor_name)
+        if motor is None:
             logger.error(f"존재하지 않는 모터: {motor_name}")
             return False
 
@@ -142,33 +205,36 @@ class MotorController:
         speed = max(0.0, min(100.0, speed))
 
         # 방향 검증
-        if direction not in ["forward", "backward", "stop"]:
+        pins = _DIR_MAP.get(direction)
+        if pins is None:
             logger.error(f"잘못된 방향: {direction}")
             return False
 
-        config = self.motor_configs[motor_name]
-
         if not self.simulation_mode:
-            # 방향 설정
-            if direction == "forward":
-                lgpio.gpio_write(self.handle, config["in1_pin"], 1)
-                lgpio.gpio_write(self.handle, config["in2_pin"], 0)
-            elif direction == "backward":
-                lgpio.gpio_write(self.handle, config["in1_pin"], 0)
-                lgpio.gpio_write(self.handle, config["in2_pin"], 1)
-            else:  # stop
-                lgpio.gpio_write(self.handle, config["in1_pin"], 0)
-                lgpio.gpio_write(self.handle, config["in2_pin"], 0)
+            # 방향 설정 (그룹이면 IN1/IN2를 한 번에)
+            if self._dir_group is not None:
+                lgpio.group_write(
+                    self.handle,
+                    self._dir_group,
+                    (pins[0] | pins[1] << 1) << motor.dir_shift,
+                    0b11 << motor.dir_shift,
+                )
+            else:
+                lgpio.gpio_write(self.handle, motor.in1_pin, pins[0])
+                lgpio.gpio_write(self.handle, motor.in2_pin, pins[1])
+            if direction == "stop":
                 speed = 0
 
             # 속도 설정 (PWM duty cycle)
-            enable_pin = self.pwm_objects[motor_name]
-            if enable_pin:
-                lgpio.tx_pwm(self.handle, enable_pin, self.pwm_frequency, speed)
+            if motor.enable_pin:
+                lgpio.tx_pwm(
+                    self.handle, motor.enable_pin, self.pwm_frequency, speed,
+                    0, pulse_cycles,
+                )
 
         # 상태 업데이트
-        self.motor_states[motor_name]["speed"] = speed
-        self.motor_states[motor_name]["direction"] = direction
+        motor.state["speed"] = speed
+        motor.state["direction"] = direction
 
         if self.simulation_mode:
             logger.info(
@@ -193,8 +259,17 @@ class MotorController:
 
     def stop_all_motors(self):
         """모든 모터를 정지시킵니다."""
-        for motor_name in self.motor_configs.keys():
-            self.stop_motor(motor_name)
+        if not self.simulation_mode and self._dir_group is not None:
+            # 모든 방향 핀을 한 번에 0으로
+            lgpio.group_write(self.handle, self._dir_group, 0, self._dir_mask)
+            for motor in self._motors.values():
+                if motor.enable_pin:
+                    lgpio.tx_pwm(self.handle, motor.enable_pin, self.pwm_frequency, 0)
+                motor.state["speed"] = 0
+                motor.state["direction"] = "stop"
+        else:
+            for motor_name in self.motor_configs.keys():
+                self.stop_motor(motor_name)
         logger.info("모든 모터 정지")
 
     def move_motor_for_duration(
@@ -212,14 +287,66 @@ class MotorController:
         Returns:
             동작 성공 여부
         """
-        if not self.set_motor_speed(motor_name, speed, direction):
+        if not self.move_motor_for_duration_async(motor_name, speed, direction, duration):
             return False
 
-        time.sleep(duration)
-        self.stop_motor(motor_name)
+        self.wait_motor(motor_name)
+        return True
+
+    def move_motor_for_duration_async(
+        self, motor_name: str, speed: float, direction: str, duration: float
+    ) -> bool:
+        """
+        모터를 지정된 시간 동안 동작시키고 바로 반환합니다.
+
+        PWM 펄스 수를 duration * pwm_frequency로 지정하므로 시간이 지나면
+        하드웨어가 스스로 출력을 멈춥니다. 상태 정리는 wait_motor에서 합니다.
+
+        Args:
+            motor_name: 모터 이름
+            speed: 속도 (0.0 ~ 100.0 %)
+            direction: 방향 ('forward', 'backward', 'stop')
+            duration: 동작 시간 (초)
+
+        Returns:
+            시작 성공 여부
+        """
+        cycles = max(1, int(duration * self.pwm_frequency))
+        if direction == "stop":
+            cycles = 0
+
+        if not self.set_motor_speed(motor_name, speed, direction, pulse_cycles=cycles):
+            return False
 
+        self._deadlines[motor_name] = time.monotonic() + duration
         return True
 
+    def wait_motor(self, motor_name: str):
+        """
+        move_motor_for_duration_async로 시작한 동작이 끝날 때까지 기다린 뒤 모터를 정지시킵니다.
+
+        Args:
+            motor_name: 모터 이름
+        """
+        deadline = self._deadlines.pop(motor_name, None)
+        if deadline is None:
+            return
+
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        # 하드웨어 펄스가 남아 있으면 잠시 더 대기 (최대 0.1초)
+        motor = self._motors[motor_name]
+        if not self.simulation_mode and motor.enable_pin:
+            while (
+                lgpio.tx_busy(self.handle, motor.enable_pin, lgpio.TX_PWM)
+                and time.monotonic() < deadline + 0.1
+            ):
+                time.sleep(0.001)
+
+        self.stop_motor(motor_name)
+
     def get_motor_state(self, motor_name: str) -> Optional[Dict]:
         """
         모터의 현재 상태를 반환합니다.
@@ -303,14 +430,36 @@ class MotorController:
             logger.error(f"존재하지 않는 모터: {motor_name}")
             return False
 
-        current_speed = self.motor_states[motor_name]["speed"]
-        speed_increment = (target_speed - current_speed) / steps
+        if direction == "stop":
+            return self.stop_motor(motor_name)
+
+        # 가속 스케줄을 미리 계산 (속도 범위 제한 포함)
+        motor = self._motors[motor_name]
+        state = motor.state
+        schedule = np.clip(
+            np.linspace(state["speed"], target_speed, steps + 1), 0.0, 100.0
+        ).tolist()
         step_delay = accel_time / steps
 
-        for i in range(steps + 1):
-            speed = current_speed + (speed_increment * i)
-            self.set_motor_speed(motor_name, speed, direction)
-            time.sleep(step_delay)
+        # 첫 단계에서 방향 핀까지 설정하고, 이후에는 PWM duty만 갱신
+        if not self.set_motor_speed(motor_name, schedule[0], direction):
+            return False
+
+        # enable 핀이 없는 모터는 갱신할 PWM이 없으므로 가속 시간만 대기
+        if not self.simulation_mode and motor.enable_pin:
+            handle = self.handle
+            enable_pin = motor.enable_pin
+            frequency = self.pwm_frequency
+            for speed in schedule[1:]:
+                time.sleep(step_delay)
+                lgpio.tx_pwm(handle, enable_pin, frequency, speed)
+        else:
+            time.sleep(step_delay * steps)
+        time.sleep(step_delay)
+
+        # 상태는 마지막에 한 번만 갱신
+        state["speed"] = schedule[-1]
+        logger.debug(f"모터 '{motor_name}': {direction} 방향, {schedule[-1]:.1f}%까지 가속")
 
         return True
 
@@ -330,21 +479,51 @@ class MotorController:
         Returns:
             실행 성공 여부
         """
-        if motor_name not in self.motor_configs:
-            logger.error(f"존재하지 않는 모터: {motor_name}")
-            return False
+        return self.execute_motor_sequences({motor_name: sequence})
+
+    def execute_motor_sequences(self, sequences: Dict[str, list]) -> bool:
+        """
+        여러 모터의 동작 시퀀스를 동시에 실행합니다.
 
-        logger.info(f"모터 '{motor_name}' 시퀀스 실행 시작 ({len(sequence)}단계)")
+        각 단계는 하드웨어 펄스 수로 끝나므로, 스레드 없이 가장 먼저
+        끝나는 모터부터 기다렸다가 그 모터의 다음 단계를 시작합니다.
 
-        for i, step in enumerate(sequence):
-            speed = step.get("speed", 0)
-            direction = step.get("direction", "stop")
-            duration = step.get("duration", 1.0)
+        Args:
+            sequences: {motor_name: 동작 시퀀스 리스트} (형식은 execute_motor_sequence 참고)
 
-            logger.debug(f"  단계 {i + 1}: {direction} {speed}% for {duration}s")
-            self.move_motor_for_duration(motor_name, speed, direction, duration)
+        Returns:
+            실행 성공 여부
+        """
+        for motor_name in sequences:
+            if motor_name not in self.motor_configs:
+                logger.error(f"존재하지 않는 모터: {motor_name}")
+                return False
+
+        pending = {}
+        for motor_name, sequence in sequences.items():
+            logger.info(f"모터 '{motor_name}' 시퀀스 실행 시작 ({len(sequence)}단계)")
+            pending[motor_name] = enumerate(sequence)
+
+        def start_next(motor_name: str) -> bool:
+            """다음 단계를 시작 (남은 단계가 없으면 False)"""
+            for i, step in pending[motor_name]:
+                speed = step.get("speed", 0)
+                direction = step.get("direction", "stop")
+                duration = step.get("duration", 1.0)
+
+                logger.debug(f"  {motor_name} 단계 {i + 1}: {direction} {speed}% for {duration}s")
+                if self.move_motor_for_duration_async(motor_name, speed, direction, duration):
+                    return True
+            logger.info(f"모터 '{motor_name}' 시퀀스 실행 완료")
+            return False
+
+        running = [name for name in sequences if start_next(name)]
+        while running:
+            motor_name = min(running, key=self._deadlines.__getitem__)
+            self.wait_motor(motor_name)
+            if not start_next(motor_name):
+                running.remove(motor_name)
 
-        logger.info(f"모터 '{motor_name}' 시퀀스 실행 완료")
         return True
 
     def cleanup(self):
@@ -367,8 +546,14 @@ class MotorController:
                     
                     # 핀 해제
                     lgpio.gpio_free(self.handle, enable_pin)
-                    lgpio.gpio_free(self.handle, in1_pin)
-                    lgpio.gpio_free(self.handle, in2_pin)
+                    if self._dir_group is None:
+                        lgpio.gpio_free(self.handle, in1_pin)
+                        lgpio.gpio_free(self.handle, in2_pin)
+
+                # 방향 핀 그룹 해제
+                if self._dir_group is not None:
+                    lgpio.group_free(self.handle, self._dir_group)
+                    self._dir_group = None
                 
                 # 핸들 닫기
                 lgpio.gpiochip_close(self.handle)
@@ -472,14 +657,26 @@ class StepperMotorController:
         # 스텝 신호 생성
         delay = (1.0 / (self.steps_per_revolution * self.microsteps)) / speed
 
-        for i in range(actual_steps):
-            if not self.simulation_mode:
-                lgpio.gpio_write(self.handle, self.step_pin, 1)
-                time.sleep(delay / 2)
-                lgpio.gpio_write(self.handle, self.step_pin, 0)
-                time.sleep(delay / 2)
-            else:
-                time.sleep(delay)
+        if not self.simulation_mode and TX_PULSE_AVAILABLE:
+            # 펄스열을 lgpio에 한 번에 넘기고 (하드웨어 타이밍) 끝날 때까지 대기
+            if actual_steps > 0:
+                half_period_us = max(1, int(delay * 1_000_000 / 2))
+                lgpio.tx_pulse(
+                    self.handle, self.step_pin, half_period_us, half_period_us,
+                    0, actual_steps,
+                )
+                time.sleep(actual_steps * 2 * half_period_us / 1_000_000)
+                while lgpio.tx_busy(self.handle, self.step_pin, lgpio.TX_PWM):
+                    time.sleep(0.001)
+        else:
+            for i in range(actual_steps):
+                if not self.simulation_mode:
+                    lgpio.gpio_write(self.handle, self.step_pin, 1)
+                    time.sleep(delay / 2)
+                    lgpio.gpio_write(self.handle, self.step_pin, 0)
+                    time.sleep(delay / 2)
+                else:
+                    time.sleep(delay)
 
         # 위치 업데이트
         if clockwise:
@@ -5,11 +5,14 @@
 체스보드 패턴을 사용하여 카메라 파라미터와 스테레오 관계를 추출합니다.
 """
 
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 import pickle
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -24,6 +27,43 @@ class StereoCalibration:
     스테레오 비전을 위한 rectification 맵을 생성합니다.
     """
 
+    # 미리보기용 체스보드 검출 플래그 (보드가 없으면 빠르게 종료)
+    PREVIEW_CB_FLAGS = (
+        cv2.CALIB_CB_FAST_CHECK
+        | cv2.CALIB_CB_ADAPTIVE_THRESH
+        | cv2.CALIB_CB_NORMALIZE_IMAGE
+    )
+
+    # 미리보기 검출용 축소 비율 (면적 1/4)
+    PREVIEW_SCALE = 0.5
+
+    # 캘리브레이션 보조용 섹터 기반 검출 플래그 (findChessboardCornersSB)
+    # CALIB_CB_ACCURACY는 검출 시간이 몇 배로 늘어 제외
+    SB_CB_FLAGS = getattr(cv2, "CALIB_CB_NORMALIZE_IMAGE", 0) | getattr(
+        cv2, "CALIB_CB_EXHAUSTIVE", 0
+    )
+
+    # 점진적 캘리브레이션에서 유지할 최근 코너 세트 수와 갱신에 필요한 최소 세트 수
+    INCREMENTAL_BUFFER_SIZE = 20
+    MIN_INCREMENTAL_SETS = 10
+
+    # save/load 대상 배열 속성 이름
+    CALIB_ARRAY_KEYS = (
+        "camera_matrix_left",
+        "dist_coeffs_left",
+        "camera_matrix_right",
+        "dist_coeffs_right",
+        "R",
+        "T",
+        "E",
+        "F",
+        "map1_left",
+        "map2_left",
+        "map1_right",
+        "map2_right",
+        "Q",
+    )
+
     def __init__(
         self,
         chessboard_size: Tuple[int, int] = (9, 6),
@@ -58,26 +98,56 @@ class StereoCalibration:
         self.map2_right = None
         self.Q = None  # Disparity-to-depth mapping matrix
 
+        # OpenCL(T-API) remap용 UMat 맵 캐시와 원본 맵 (맵이 바뀌었는지 확인용)
+        self._umaps = None
+        self._umaps_source = None
+
+        # 좌우를 가로로 붙인 프레임용 결합 맵 캐시와 원본 맵
+        self._stitched_maps = None
+        self._stitched_source = None
+
+        # 지연 로드 중인 .npz 캘리브레이션 파일 (load_calibration 참고)
+        self._calib_file = None
+
         # 3D 좌표 계산용
         self._object_points = self._create_object_points()
 
+        # 점진적 캘리브레이션용 최근 코너 세트, 이미지 크기, 현재 R/T의 스테레오 RMS 에러
+        self._img_pts_l_buffer = deque(maxlen=self.INCREMENTAL_BUFFER_SIZE)
+        self._img_pts_r_buffer = deque(maxlen=self.INCREMENTAL_BUFFER_SIZE)
+        self._img_size = None
+        self._stereo_rms = None
+
+        # stereoCalibrate의 CALIB_USE_EXTRINSIC_GUESS 지원 여부 (거부되면 False로 바뀜)
+        self._extrinsic_guess_supported = True
+
     def _create_object_points(self) -> np.ndarray:
-        """체스보드의 3D 좌표를 생성합니다."""
-        objp = np.zeros(
-            (self.chessboard_size[0] * self.chessboard_size[1], 3), np.float32
-        )
-        objp[:, :2] = np.mgrid[
-            0 : self.chessboard_size[0], 0 : self.chessboard_size[1]
-        ].T.reshape(-1, 2)
-        objp *= self.square_size
+        """
+        체스보드의 3D 좌표를 생성합니다.
+
+        모든 캘리브레이션 프레임이 같은 배열을 공유하므로 읽기 전용으로 반환합니다.
+        """
+        cols, rows = self.chessboard_size
+        xs = np.arange(cols, dtype=np.float32) * self.square_size
+        ys = np.arange(rows, dtype=np.float32) * self.square_size
+        gx, gy = np.meshgrid(xs, ys, indexing="xy")
+
+        objp = np.empty((cols * rows, 3), np.float32)
+        objp[:, 0] = gx.ravel()
+        objp[:, 1] = gy.ravel()
+        objp[:, 2] = 0
+        objp.flags.writeable = False
         return objp
 
     def capture_calibration_images(
         self, cap_left, cap_right, num_images: int = 20, display: bool = True
-    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    ) -> Tuple[List[np.ndarray], List[np.ndarray], List[np.ndarray], List[np.ndarray]]:
         """
         캘리브레이션용 이미지를 캡처합니다.
 
+        캡처할 때 원본 해상도에서 찾은 코너도 함께 반환하므로,
+        calibrate_cameras에 넘기면 코너 검출을 다시 하지 않습니다.
+
         Args:
             cap_left: 왼쪽 카메라 VideoCapture 객체
             cap_right: 오른쪽 카메라 VideoCapture 객체
@@ -85,10 +155,12 @@ class StereoCalibration:
             display: 이미지를 화면에 표시할지 여부
 
         Returns:
-            (왼쪽 이미지 리스트, 오른쪽 이미지 리스트)
+            (왼쪽 이미지 리스트, 오른쪽 이미지 리스트, 왼쪽 코너 리스트, 오른쪽 코너 리스트)
         """
         images_left = []
         images_right = []
+        corners_list_left = []
+        corners_list_right = []
 
         logger.info(f"체스보드 패턴을 감지하여 {num_images}장의 이미지를 캡처합니다.")
         logger.info("스페이스바: 이미지 캡처, ESC: 종료")
@@ -101,45 +173,105 @@ class StereoCalibration:
                 logger.error("카메라에서 프레임을 읽을 수 없습니다.")
                 break
 
-            gray_left = cv2.cvtColor(frame_left, cv2.COLOR_BGR2GRAY)
-            gray_right = cv2.cvtColor(frame_right, cv2.COLOR_BGR2GRAY)
+            # 미리보기 검출은 축소한 프레임에서 수행 (원본 그레이는 캡처할 때만 만듦)
+            gray_small_left = self._preview_gray(frame_left)
+            gray_small_right = self._preview_gray(frame_right)
 
-            # 체스보드 코너 찾기
+            # 체스보드 코너 찾기 (미리보기: 보드가 없는 프레임은 FAST_CHECK로 빠르게 거름)
             ret_left, corners_left = cv2.findChessboardCorners(
-                gray_left, self.chessboard_size, None
+                gray_small_left, self.chessboard_size, flags=self.PREVIEW_CB_FLAGS
             )
             ret_right, corners_right = cv2.findChessboardCorners(
-                gray_right, self.chessboard_size, None
+                gray_small_right, self.chessboard_size, flags=self.PREVIEW_CB_FLAGS
             )
 
-            # 디스플레이용 프레임 복사
-            display_left = frame_left.copy()
-            display_right = frame_right.copy()
+            found = ret_left and ret_right
+            if display:
+                self._show_preview(
+                    frame_left,
+                    frame_right,
+                    corners_left if found else None,
+                    corners_right if found else None,
+                    len(images_left),
+                    num_images,
+                )
 
-            if ret_left and ret_right:
-                cv2.drawChessboardCorners(
-                    display_left, self.chessboard_size, corners_left, ret_left
+            key = cv2.waitKey(1) & 0xFF
+
+            if key == 32 and found:  # 스페이스바
+                gray_left = cv2.cvtColor(frame_left, cv2.COLOR_BGR2GRAY)
+                gray_right = cv2.cvtColor(frame_right, cv2.COLOR_BGR2GRAY)
+
+                # 저장할 프레임만 원본 해상도에서 FAST_CHECK 없이 전체 검출로 다시 확인
+                found_left, full_corners_left = cv2.findChessboardCorners(
+                    gray_left, self.chessboard_size, None
                 )
-                cv2.drawChessboardCorners(
-                    display_right, self.chessboard_size, corners_right, ret_right
+                found_right, full_corners_right = cv2.findChessboardCorners(
+                    gray_right, self.chessboard_size, None
                 )
-                status_text = f"체스보드 감지! [{len(images_left)}/{num_images}] - 스페이스바로 캡처"
-                color = (0, 255, 0)
-            else:
-                status_text = f"체스보드를 찾는 중... [{len(images_left)}/{num_images}]"
-                color = (0, 0, 255)
+                if found_left and found_right:
+                    images_left.append(gray_left)
+                    images_right.append(gray_right)
+                    corners_list_left.append(full_corners_left)
+                    corners_list_right.append(full_corners_right)
+                    logger.info(f"이미지 {len(images_left)}/{num_images} 캡처됨")
+                else:
+                    logger.warning("체스보드 검출에 실패했습니다. 다시 캡처하세요.")
 
-            cv2.putText(
-                display_left,
-                status_text,
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                color,
-                2,
+            elif key == 27:  # ESC
+                logger.warning("사용자에 의해 캡처가 중단되었습니다.")
+                break
+
+        if display:
+            cv2.destroyAllWindows()
+
+        return images_left, images_right, corners_list_left, corners_list_right
+
+    def _show_preview(
+        self,
+        frame_left: np.ndarray,
+        frame_right: np.ndarray,
+        corners_left: Optional[np.ndarray],
+        corners_right: Optional[np.ndarray],
+        num_captured: int,
+        num_images: int,
+    ):
+        """
+        캡처 미리보기 화면에 코너와 상태 문구를 그려 표시합니다.
+
+        보드가 감지된 프레임은 캡처될 수 있으므로 복사본에 그리고,
+        감지되지 않은 프레임은 다음 read()에서 버려지므로 원본에 바로 그립니다.
+
+        Args:
+            frame_left: 왼쪽 카메라 프레임
+            frame_right: 오른쪽 카메라 프레임
+            corners_left: 왼쪽 미리보기 코너 (축소 좌표, 미감지 시 None)
+            corners_right: 오른쪽 미리보기 코너 (축소 좌표, 미감지 시 None)
+            num_captured: 지금까지 캡처한 이미지 수
+            num_images: 캡처할 이미지 수
+        """
+        if corners_left is not None and corners_right is not None:
+            display_left = frame_left.copy()
+            display_right = frame_right.copy()
+
+            # 축소 좌표를 원본 프레임 좌표로 환산해서 표시
+            cv2.drawChessboardCorners(
+                display_left, self.chessboard_size, corners_left / self.PREVIEW_SCALE, True
+            )
+            cv2.drawChessboardCorners(
+                display_right, self.chessboard_size, corners_right / self.PREVIEW_SCALE, True
             )
+            status_text = f"체스보드 감지! [{num_captured}/{num_images}] - 스페이스바로 캡처"
+            color = (0, 255, 0)
+        else:
+            display_left = frame_left
+            display_right = frame_right
+            status_text = f"체스보드를 찾는 중... [{num_captured}/{num_images}]"
+            color = (0, 0, 255)
+
+        for display_frame in (display_left, display_right):
             cv2.putText(
-                display_right,
+                display_frame,
                 status_text,
                 (10, 30),
                 cv2.FONT_HERSHEY_SIMPLEX,
@@ -148,28 +280,87 @@ class StereoCalibration:
                 2,
             )
 
-            if display:
-                cv2.imshow("Left Camera", display_left)
-                cv2.imshow("Right Camera", display_right)
+        cv2.imshow("Left Camera", display_left)
+        cv2.imshow("Right Camera", display_right)
 
-            key = cv2.waitKey(1) & 0xFF
+    def _preview_gray(self, frame: np.ndarray) -> np.ndarray:
+        """미리보기 검출용으로 프레임을 축소한 그레이스케일 이미지를 만듭니다."""
+        h, w = frame.shape[:2]
+        size = (int(w * self.PREVIEW_SCALE), int(h * self.PREVIEW_SCALE))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
 
-            if key == 32 and ret_left and ret_right:  # 스페이스바
-                images_left.append(gray_left)
-                images_right.append(gray_right)
-                logger.info(f"이미지 {len(images_left)}/{num_images} 캡처됨")
+    def _detect_corners_pair(
+        self,
+        img_left: np.ndarray,
+        img_right: np.ndarray,
+        criteria: tuple,
+        corners_left: Optional[np.ndarray] = None,
+        corners_right: Optional[np.ndarray] = None,
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        이미지 쌍에서 체스보드 코너를 찾고 서브픽셀 정확도로 개선합니다.
 
-            elif key == 27:  # ESC
-                logger.warning("사용자에 의해 캡처가 중단되었습니다.")
-                break
+        기존 검출 + cornerSubPix를 먼저 시도하고, 실패하면 섹터 기반 검출기
+        (findChessboardCornersSB)로 다시 찾습니다. 한 쌍의 두 이미지는 항상 같은
+        검출기를 사용합니다 (두 검출기의 코너 순서가 다를 수 있음).
 
-        if display:
-            cv2.destroyAllWindows()
+        Args:
+            img_left: 왼쪽 카메라 그레이스케일 이미지
+            img_right: 오른쪽 카메라 그레이스케일 이미지
+            criteria: cornerSubPix 종료 조건
+            corners_left: 이미 찾은 왼쪽 코너 (주어지면 검출을 건너뛰고 개선만 함)
+            corners_right: 이미 찾은 오른쪽 코너
 
-        return images_left, images_right
+        Returns:
+            (왼쪽 코너, 오른쪽 코너) 또는 None (한쪽이라도 감지 실패)
+        """
+        if corners_left is not None and corners_right is not None:
+            # cornerSubPix는 입력 배열을 덮어쓰므로 복사본을 넘김
+            ret_left = ret_right = True
+            corners_left = corners_left.copy()
+            corners_right = corners_right.copy()
+        else:
+            ret_left, corners_left = cv2.findChessboardCorners(
+                img_left, self.chessboard_size, None
+            )
+            ret_right, corners_right = cv2.findChessboardCorners(
+                img_right, self.chessboard_size, None
+            )
+
+        if ret_left and ret_right:
+            # 서브픽셀 정확도로 코너 위치 개선
+            corners_left = cv2.cornerSubPix(
+                img_left, corners_left, (11, 11), (-1, -1), criteria
+            )
+            corners_right = cv2.cornerSubPix(
+                img_right, corners_right, (11, 11), (-1, -1), criteria
+            )
+            return corners_left, corners_right
+
+        # 섹터 기반 검출기: 자체적으로 서브픽셀 정확도라 cornerSubPix가 필요 없음
+        try:
+            ret_left, corners_left = cv2.findChessboardCornersSB(
+                img_left, self.chessboard_size, flags=self.SB_CB_FLAGS
+            )
+            ret_right, corners_right = cv2.findChessboardCornersSB(
+                img_right, self.chessboard_size, flags=self.SB_CB_FLAGS
+            )
+        except (AttributeError, cv2.error) as e:
+            # 구버전 OpenCV
+            logger.debug(f"findChessboardCornersSB 사용 불가: {e}")
+            return None
+
+        if not (ret_left and ret_right):
+            return None
+        return corners_left.reshape(-1, 1, 2), corners_right.reshape(-1, 1, 2)
 
     def calibrate_cameras(
-        self, images_left: List[np.ndarray], images_right: List[np.ndarray]
+        self,
+        images_left: List[np.ndarray],
+        images_right: List[np.ndarray],
+        precomputed_corners_left: Optional[List[np.ndarray]] = None,
+        precomputed_corners_right: Optional[List[np.ndarray]] = None,
     ) -> bool:
         """
         스테레오 카메라 캘리브레이션을 수행합니다.
@@ -177,6 +368,9 @@ class StereoCalibration:
         Args:
             images_left: 왼쪽 카메라 이미지 리스트
             images_right: 오른쪽 카메라 이미지 리스트
+            precomputed_corners_left: capture_calibration_images에서 찾은 왼쪽 코너 리스트
+                (주어지면 코너 검출을 건너뛰고 cornerSubPix 개선만 수행)
+            precomputed_corners_right: 오른쪽 코너 리스트
 
         Returns:
             캘리브레이션 성공 여부
@@ -187,34 +381,40 @@ class StereoCalibration:
 
         logger.info("카메라 캘리브레이션을 시작합니다...")
 
-        # 3D 포인트와 2D 포인트 수집
-        obj_points = []  # 3D points in real world space
+        # 2D 포인트 수집
         img_points_left = []  # 2D points in left image plane
         img_points_right = []  # 2D points in right image plane
 
         criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
 
-        for img_left, img_right in zip(images_left, images_right):
-            ret_left, corners_left = cv2.findChessboardCorners(
-                img_left, self.chessboard_size, None
-            )
-            ret_right, corners_right = cv2.findChessboardCorners(
-                img_right, self.chessboard_size, None
+        if precomputed_corners_left is None or precomputed_corners_right is None:
+            precomputed_corners_left = precomputed_corners_right = [None] * len(
+                images_left
             )
 
-            if ret_left and ret_right:
-                obj_points.append(self._object_points)
-
-                # 서브픽셀 정확도로 코너 위치 개선
-                corners_left = cv2.cornerSubPix(
-                    img_left, corners_left, (11, 11), (-1, -1), criteria
-                )
-                corners_right = cv2.cornerSubPix(
-                    img_right, corners_right, (11, 11), (-1, -1), criteria
+        # 이미지 쌍별 코너 검출을 병렬로 수행 (OpenCV는 검출 중 GIL을 해제)
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(
+                executor.map(
+                    lambda args: self._detect_corners_pair(
+                        args[0], args[1], criteria, args[2], args[3]
+                    ),
+                    zip(
+                        images_left,
+                        images_right,
+                        precomputed_corners_left,
+                        precomputed_corners_right,
+                    ),
                 )
+            )
 
-                img_points_left.append(corners_left)
-                img_points_right.append(corners_right)
+        for result in results:
+            if result is not None:
+                img_points_left.append(result[0])
+                img_points_right.append(result[1])
+
+        # 3D 포인트: 감지된 모든 프레임이 같은 (읽기 전용) 배열을 공유
+        obj_points = [self._object_points] * len(img_points_left)
 
         if len(obj_points) < 10:
             logger.error(
@@ -224,6 +424,11 @@ class StereoCalibration:
 
         img_size = images_left[0].shape[::-1]
 
+        # 이후 calibrate_incremental에서 이어서 쓸 수 있도록 최근 코너 세트 보관
+        self._img_pts_l_buffer.extend(img_points_left)
+        self._img_pts_r_buffer.extend(img_points_right)
+        self._img_size = img_size
+
         # 개별 카메라 캘리브레이션
         logger.info("왼쪽 카메라 캘리브레이션 중...")
         ret_left, self.camera_matrix_left, self.dist_coeffs_left, _, _ = (
@@ -237,66 +442,205 @@ class StereoCalibration:
 
         # 스테레오 캘리브레이션
         logger.info("스테레오 캘리브레이션 중...")
-        flags = cv2.CALIB_FIX_INTRINSIC
-
-        ret_stereo, _, _, _, _, self.R, self.T, self.E, self.F = cv2.stereoCalibrate(
+        ret_stereo, self.R, self.T, self.E, self.F = self._stereo_calibrate(
             obj_points,
             img_points_left,
             img_points_right,
-            self.camera_matrix_left,
-            self.dist_coeffs_left,
-            self.camera_matrix_right,
-            self.dist_coeffs_right,
             img_size,
-            flags=flags,
-            criteria=criteria,
+            cv2.CALIB_FIX_INTRINSIC,
+            criteria,
         )
 
         if ret_stereo:
             logger.info(f"스테레오 캘리브레이션 완료! RMS 에러: {ret_stereo:.4f}")
+            self._stereo_rms = ret_stereo
+
+            self._compute_rectification(img_size)
+
+            logger.info("Rectification 맵 생성 완료")
+            return True
+        else:
+            logger.error("스테레오 캘리브레이션 실패")
+            return False
+
+    def _stereo_calibrate(
+        self,
+        obj_points: List[np.ndarray],
+        img_points_left: List[np.ndarray],
+        img_points_right: List[np.ndarray],
+        img_size: Tuple[int, int],
+        flags: int,
+        criteria: tuple,
+        R_guess: Optional[np.ndarray] = None,
+        T_guess: Optional[np.ndarray] = None,
+    ) -> Tuple:
+        """
+        현재 내부 파라미터로 cv2.stereoCalibrate를 실행합니다.
 
-            # Stereo rectification
-            R1, R2, P1, P2, self.Q, _, _ = cv2.stereoRectify(
+        이전 캘리브레이션의 R_guess, T_guess가 주어지면 CALIB_USE_EXTRINSIC_GUESS로
+        초기값으로 넘겨 최적화 반복을 줄입니다. 주어지지 않거나 이 플래그를 지원하지 않는
+        OpenCV 버전에서는 OpenCV 자체 초기화(PnP)로 실행합니다.
+
+        Returns:
+            (RMS 에러, R, T, E, F)
+        """
+        def run(run_flags: int, R=None, T=None):
+            return cv2.stereoCalibrate(
+                obj_points,
+                img_points_left,
+                img_points_right,
                 self.camera_matrix_left,
                 self.dist_coeffs_left,
                 self.camera_matrix_right,
                 self.dist_coeffs_right,
                 img_size,
-                self.R,
-                self.T,
-                alpha=0,
+                R,
+                T,
+                flags=run_flags,
+                criteria=criteria,
             )
 
-            # Rectification 맵 생성
-            self.map1_left, self.map2_left = cv2.initUndistortRectifyMap(
-                self.camera_matrix_left,
-                self.dist_coeffs_left,
-                R1,
-                P1,
-                img_size,
-                cv2.CV_32FC1,
-            )
-            self.map1_right, self.map2_right = cv2.initUndistortRectifyMap(
-                self.camera_matrix_right,
-                self.dist_coeffs_right,
-                R2,
-                P2,
+        extrinsic_guess = getattr(cv2, "CALIB_USE_EXTRINSIC_GUESS", 0)
+        use_guess = R_guess is not None and T_guess is not None
+        if use_guess and extrinsic_guess and self._extrinsic_guess_supported:
+            try:
+                result = run(
+                    flags | extrinsic_guess,
+                    np.array(R_guess, dtype=np.float64),
+                    np.array(T_guess, dtype=np.float64).reshape(3, 1),
+                )
+                return (result[0],) + tuple(result[5:9])
+            except cv2.error as e:
+                logger.debug(f"stereoCalibrate가 CALIB_USE_EXTRINSIC_GUESS를 지원하지 않음: {e}")
+                self._extrinsic_guess_supported = False
+
+        result = run(flags)
+        return (result[0],) + tuple(result[5:9])
+
+    def _compute_rectification(self, img_size: Tuple[int, int]):
+        """
+        현재 내부/외부 파라미터로 Q 행렬과 rectification 맵을 계산합니다.
+
+        Args:
+            img_size: 이미지 크기 (width, height)
+        """
+        # Stereo rectification
+        R1, R2, P1, P2, self.Q, _, _ = cv2.stereoRectify(
+            self.camera_matrix_left,
+            self.dist_coeffs_left,
+            self.camera_matrix_right,
+            self.dist_coeffs_right,
+            img_size,
+            self.R,
+            self.T,
+            alpha=0,
+        )
+
+        # Rectification 맵 생성 (고정소수점 CV_16SC2 + CV_16UC1: remap이 더 빠르고 메모리 절반)
+        self.map1_left, self.map2_left = cv2.initUndistortRectifyMap(
+            self.camera_matrix_left,
+            self.dist_coeffs_left,
+            R1,
+            P1,
+            img_size,
+            cv2.CV_16SC2,
+        )
+        self.map1_right, self.map2_right = cv2.initUndistortRectifyMap(
+            self.camera_matrix_right,
+            self.dist_coeffs_right,
+            R2,
+            P2,
+            img_size,
+            cv2.CV_16SC2,
+        )
+
+    def calibrate_incremental(
+        self, new_image_pair: Tuple[np.ndarray, np.ndarray]
+    ) -> bool:
+        """
+        새 이미지 쌍을 추가해 스테레오 외부 파라미터(R, T)를 갱신합니다.
+
+        최근 INCREMENTAL_BUFFER_SIZE개의 코너 세트만 사용하고, 내부 파라미터는
+        고정한 채 적은 반복으로 R, T만 다시 최적화합니다.
+        calibrate_cameras 또는 load_calibration이 먼저 호출되어야 합니다.
+
+        코너 세트가 MIN_INCREMENTAL_SETS개 모일 때까지는 (예: 파일에서 불러온 직후)
+        코너만 모으고 R, T는 그대로 둡니다. 새 RMS 에러가 현재 R, T의 RMS 에러보다
+        나쁘면 결과를 버립니다.
+
+        Args:
+            new_image_pair: (왼쪽, 오른쪽) 그레이스케일 이미지
+
+        Returns:
+            갱신 성공 여부
+        """
+        if self.camera_matrix_left is None or self.R is None:
+            logger.error("점진적 캘리브레이션 전에 초기 캘리브레이션이 필요합니다.")
+            return False
+
+        img_left, img_right = new_image_pair
+        img_size = img_left.shape[::-1]
+        if self._img_size is not None and img_size != self._img_size:
+            logger.error(f"이미지 크기가 다릅니다: {img_size} != {self._img_size}")
+            return False
+
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1e-4)
+        corners = self._detect_corners_pair(img_left, img_right, criteria)
+        if corners is None:
+            logger.warning("새 이미지 쌍에서 체스보드를 찾지 못했습니다.")
+            return False
+
+        self._img_pts_l_buffer.append(corners[0])
+        self._img_pts_r_buffer.append(corners[1])
+        self._img_size = img_size
+
+        num_sets = len(self._img_pts_l_buffer)
+        if num_sets < self.MIN_INCREMENTAL_SETS:
+            logger.info(f"점진적 캘리브레이션 코너 수집 중 ({num_sets}/{self.MIN_INCREMENTAL_SETS}세트)")
+            return False
+
+        # 내부 파라미터는 고정하고 이전 R, T에서 시작해 R, T만 최적화
+        flags = cv2.CALIB_FIX_INTRINSIC | cv2.CALIB_USE_INTRINSIC_GUESS
+
+        try:
+            ret_stereo, R, T, E, F = self._stereo_calibrate(
+                [self._object_points] * num_sets,
+                list(self._img_pts_l_buffer),
+                list(self._img_pts_r_buffer),
                 img_size,
-                cv2.CV_32FC1,
+                flags,
+                criteria,
+                self.R,
+                self.T,
             )
+        except cv2.error as e:
+            logger.error(f"점진적 캘리브레이션 실패: {e}")
+            return False
 
-            logger.info("Rectification 맵 생성 완료")
-            return True
-        else:
-            logger.error("스테레오 캘리브레이션 실패")
+        if self._stereo_rms is not None and ret_stereo > self._stereo_rms:
+            logger.warning(
+                f"점진적 캘리브레이션 결과를 버립니다 (RMS 에러 {ret_stereo:.4f} > {self._stereo_rms:.4f})"
+            )
             return False
 
-    def save_calibration(self, filename: str = "stereo_calibration.pkl") -> bool:
+        self.R, self.T, self.E, self.F = R, T, E, F
+        self._stereo_rms = ret_stereo
+        self._compute_rectification(img_size)
+
+        logger.info(
+            f"점진적 캘리브레이션 완료 ({num_sets}세트) RMS 에러: {ret_stereo:.4f}"
+        )
+        return True
+
+    def save_calibration(self, filename: str = "stereo_calibration.npz") -> bool:
         """
         캘리브레이션 결과를 파일로 저장합니다.
 
+        np.savez_compressed로 배열마다 zlib 압축해 저장하므로 pickle보다
+        파일이 훨씬 작습니다 (대부분이 rectification 맵).
+
         Args:
-            filename: 저장할 파일명
+            filename: 저장할 파일명 (.npz)
 
         Returns:
             저장 성공 여부
@@ -306,38 +650,31 @@ class StereoCalibration:
             return False
 
         filepath = self.save_dir / filename
+        if filepath.suffix != ".npz":
+            filepath = filepath.with_suffix(".npz")
 
-        calib_data = {
-            "camera_matrix_left": self.camera_matrix_left,
-            "dist_coeffs_left": self.dist_coeffs_left,
-            "camera_matrix_right": self.camera_matrix_right,
-            "dist_coeffs_right": self.dist_coeffs_right,
-            "R": self.R,
-            "T": self.T,
-            "E": self.E,
-            "F": self.F,
-            "map1_left": self.map1_left,
-            "map2_left": self.map2_left,
-            "map1_right": self.map1_right,
-            "map2_right": self.map2_right,
-            "Q": self.Q,
-            "chessboard_size": self.chessboard_size,
-            "square_size": self.square_size,
-        }
+        calib_data = {key: getattr(self, key) for key in self.CALIB_ARRAY_KEYS}
 
         try:
-            with open(filepath, "wb") as f:
-                pickle.dump(calib_data, f)
+            np.savez_compressed(
+                filepath,
+                **calib_data,
+                chessboard_size=np.array(self.chessboard_size),
+                square_size=np.float32(self.square_size),
+            )
             logger.info(f"캘리브레이션 데이터 저장 완료: {filepath}")
             return True
         except Exception as e:
             logger.error(f"캘리브레이션 데이터 저장 실패: {e}")
             return False
 
-    def load_calibration(self, filename: str = "stereo_calibration.pkl") -> bool:
+    def load_calibration(self, filename: str = "stereo_calibration.npz") -> bool:
         """
         저장된 캘리브레이션 결과를 불러옵니다.
 
+        이전 버전에서 저장한 .pkl 파일도 읽을 수 있습니다 (.npz 파일이 없으면
+        같은 이름의 .pkl 파일을 찾음).
+
         Args:
             filename: 불러올 파일명
 
@@ -347,28 +684,39 @@ class StereoCalibration:
         filepath = self.save_dir / filename
 
         if not filepath.exists():
-            logger.error(f"캘리브레이션 파일을 찾을 수 없습니다: {filepath}")
-            return False
+            legacy = filepath.with_suffix(".pkl")
+            if filepath.suffix == ".npz" and legacy.exists():
+                filepath = legacy
+            else:
+                logger.error(f"캘리브레이션 파일을 찾을 수 없습니다: {filepath}")
+                return False
 
         try:
+            if filepath.suffix != ".pkl":
+                return self._load_npz(filepath)
+
             with open(filepath, "rb") as f:
                 calib_data = pickle.load(f)
 
-            self.camera_matrix_left = calib_data["camera_matrix_left"]
-            self.dist_coeffs_left = calib_data["dist_coeffs_left"]
-            self.camera_matrix_right = calib_data["camera_matrix_right"]
-            self.dist_coeffs_right = calib_data["dist_coeffs_right"]
-            self.R = calib_data["R"]
-            self.T = calib_data["T"]
-            self.E = calib_data["E"]
-            self.F = calib_data["F"]
-            self.map1_left = calib_data["map1_left"]
-            self.map2_left = calib_data["map2_left"]
-            self.map1_right = calib_data["map1_right"]
-            self.map2_right = calib_data["map2_right"]
-            self.Q = calib_data["Q"]
-            self.chessboard_size = calib_data["chessboard_size"]
-            self.square_size = calib_data["square_size"]
+            self._close_calib_file()
+            self._reset_incremental()
+            for key in self.CALIB_ARRAY_KEYS:
+                setattr(self, key, calib_data[key])
+            self.chessboard_size = tuple(int(v) for v in calib_data["chessboard_size"])
+            self.square_size = float(calib_data["square_size"])
+
+            # 이전 버전의 float 맵은 고정소수점으로 변환해서 사용
+            if self.map1_left is not None and self.map1_left.dtype == np.float32:
+                logger.warning(
+                    "float 형식의 rectification 맵입니다. 고정소수점으로 변환합니다 "
+                    "(다시 저장하거나 재캘리브레이션하면 변환 없이 로드됩니다)."
+                )
+                self.map1_left, self.map2_left = cv2.convertMaps(
+                    self.map1_left, self.map2_left, cv2.CV_16SC2
+                )
+                self.map1_right, self.map2_right = cv2.convertMaps(
+                    self.map1_right, self.map2_right, cv2.CV_16SC2
+                )
 
             logger.info(f"캘리브레이션 데이터 로드 완료: {filepath}")
             return True
@@ -376,15 +724,99 @@ class StereoCalibration:
             logger.error(f"캘리브레이션 데이터 로드 실패: {e}")
             return False
 
+    def _load_npz(self, filepath: Path) -> bool:
+        """
+        .npz 캘리브레이션 파일을 열고 배열은 처음 접근할 때 읽도록 합니다.
+
+        np.load가 반환하는 NpzFile은 항목을 꺼낼 때 압축을 풀기 때문에,
+        baseline만 확인하는 경우 등에는 큰 rectification 맵을 읽지 않습니다.
+        """
+        npz = np.load(filepath)
+        missing = set(self.CALIB_ARRAY_KEYS).difference(npz.files)
+        if missing:
+            npz.close()
+            logger.error(f"캘리브레이션 파일에 항목이 없습니다: {sorted(missing)}")
+            return False
+
+        self._close_calib_file()
+        self._reset_incremental()
+        self._calib_file = npz
+
+        # 인스턴스 속성을 지워 두면 __getattr__에서 파일의 값을 읽어 채움
+        for key in self.CALIB_ARRAY_KEYS:
+            self.__dict__.pop(key, None)
+        self.chessboard_size = tuple(int(v) for v in npz["chessboard_size"].tolist())
+        self.square_size = float(npz["square_size"])
+
+        logger.info(f"캘리브레이션 데이터 로드 완료: {filepath}")
+        return True
+
+    def __getattr__(self, name: str):
+        """아직 읽지 않은 캘리브레이션 배열을 파일에서 읽어 속성으로 캐시합니다."""
+        calib_file = self.__dict__.get("_calib_file")
+        if calib_file is None or name not in self.CALIB_ARRAY_KEYS:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+
+        value = calib_file[name]
+        setattr(self, name, value)
+        return value
+
+    def _close_calib_file(self):
+        """
+        지연 로드 중인 캘리브레이션 파일을 닫습니다.
+
+        다른 파일을 불러오기 직전에만 호출합니다 (모든 배열 속성을 바로 다시 채움).
+        """
+        if self._calib_file is not None:
+            self._calib_file.close()
+            self._calib_file = None
+
+    def _reset_incremental(self):
+        """
+        점진적 캘리브레이션 상태를 비웁니다.
+
+        다른 캘리브레이션을 불러오면 이전 코너 세트와 RMS 에러는 더 이상 맞지 않으므로
+        다시 MIN_INCREMENTAL_SETS개를 모은 뒤에 갱신합니다 (불러온 R, T의 RMS 에러는 알 수 없음).
+        """
+        self._img_pts_l_buffer.clear()
+        self._img_pts_r_buffer.clear()
+        self._img_size = None
+        self._stereo_rms = None
+
+    def _umat_maps(self) -> Tuple:
+        """
+        rectification 맵을 UMat으로 올려 캐시합니다 (맵이 바뀌면 다시 만듦).
+
+        Returns:
+            (map1_left, map2_left, map1_right, map2_right) UMat
+        """
+        if self._umaps is None or self._umaps_source is not self.map1_left:
+            self._umaps = tuple(
+                cv2.UMat(m)
+                for m in (
+                    self.map1_left,
+                    self.map2_left,
+                    self.map1_right,
+                    self.map2_right,
+                )
+            )
+            self._umaps_source = self.map1_left
+        return self._umaps
+
     def rectify_images(
-        self, img_left: np.ndarray, img_right: np.ndarray
+        self, img_left, img_right, return_umat: bool = False
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         스테레오 이미지를 rectify합니다.
 
+        OpenCL을 쓸 수 있거나 입력이 UMat이면 T-API(cv2.UMat)로 GPU에서 remap합니다.
+
         Args:
-            img_left: 왼쪽 카메라 이미지
-            img_right: 오른쪽 카메라 이미지
+            img_left: 왼쪽 카메라 이미지 (ndarray 또는 UMat)
+            img_right: 오른쪽 카메라 이미지 (ndarray 또는 UMat)
+            return_umat: True면 결과를 UMat으로 반환 (입력이 UMat이어도 UMat 반환)
 
         Returns:
             (rectified 왼쪽 이미지, rectified 오른쪽 이미지)
@@ -395,14 +827,86 @@ class StereoCalibration:
             )
             return img_left, img_right
 
-        rect_left = cv2.remap(
-            img_left, self.map1_left, self.map2_left, cv2.INTER_LINEAR
-        )
-        rect_right = cv2.remap(
-            img_right, self.map1_right, self.map2_right, cv2.INTER_LINEAR
-        )
+        input_umat = isinstance(img_left, cv2.UMat)
+        if not (return_umat or input_umat or cv2.ocl.useOpenCL()):
+            rect_left = cv2.remap(
+                img_left, self.map1_left, self.map2_left, cv2.INTER_LINEAR
+            )
+            rect_right = cv2.remap(
+                img_right, self.map1_right, self.map2_right, cv2.INTER_LINEAR
+            )
+            return rect_left, rect_right
+
+        map1_left, map2_left, map1_right, map2_right = self._umat_maps()
+        if not input_umat:
+            img_left = cv2.UMat(img_left)
+            img_right = cv2.UMat(img_right)
+
+        rect_left = cv2.remap(img_left, map1_left, map2_left, cv2.INTER_LINEAR)
+        rect_right = cv2.remap(img_right, map1_right, map2_right, cv2.INTER_LINEAR)
+
+        if return_umat or input_umat:
+            return rect_left, rect_right
+        return rect_left.get(), rect_right.get()
+
+    def _build_stitched_maps(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        좌우 맵을 (H, 2W) 결합 맵으로 만들어 캐시합니다 (맵이 바뀌면 다시 만듦).
+
+        오른쪽 절반의 x 좌표는 W만큼 밀고, 자기 절반 밖을 가리키는 좌표는
+        원래 remap처럼 테두리(검정)가 되도록 이미지 밖으로 보냅니다.
+
+        Returns:
+            (결합 map1, 결합 map2) - CV_16SC2, CV_16UC1
+        """
+        if self._stitched_maps is None or self._stitched_source is not self.map1_left:
+            width = self.map1_left.shape[1]
+
+            map1_left = self.map1_left.copy()
+            map1_left[map1_left[..., 0] >= width - 1] = -2
+
+            map1_right = self.map1_right.copy()
+            outside = map1_right[..., 0] < 0
+            map1_right[..., 0] += width
+            map1_right[outside] = -2
+
+            self._stitched_maps = (
+                np.hstack((map1_left, map1_right)),
+                np.hstack((self.map2_left, self.map2_right)),
+            )
+            self._stitched_source = self.map1_left
+        return self._stitched_maps
+
+    def rectify_stereo_pair_stitched(
+        self, stitched_frame: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        좌우 영상이 가로로 붙어 있는 프레임(일체형 USB 스테레오 카메라 등)을 rectify합니다.
+
+        결합 맵으로 remap을 한 번만 호출하고 결과를 반으로 나눕니다.
+        프레임 너비가 캘리브레이션 너비의 2배가 아니면 나눈 뒤 rectify_images를 사용합니다.
+
+        Args:
+            stitched_frame: [왼쪽 | 오른쪽] 형태의 프레임
+
+        Returns:
+            (rectified 왼쪽 이미지, rectified 오른쪽 이미지) - 결과 프레임의 뷰
+        """
+        if self.map1_left is None:
+            logger.error(
+                "Rectification 맵이 없습니다. 먼저 캘리브레이션을 수행하거나 로드하세요."
+            )
+            half = stitched_frame.shape[1] // 2
+            return stitched_frame[:, :half], stitched_frame[:, half:]
+
+        height, width = self.map1_left.shape[:2]
+        if stitched_frame.shape[:2] != (height, 2 * width):
+            half = stitched_frame.shape[1] // 2
+            return self.rectify_images(stitched_frame[:, :half], stitched_frame[:, half:])
 
-        return rect_left, rect_right
+        map1, map2 = self._build_stitched_maps()
+        rect = cv2.remap(stitched_frame, map1, map2, cv2.INTER_LINEAR)
+        return rect[:, :width], rect[:, width:]
 
     def get_baseline(self) -> float:
         """
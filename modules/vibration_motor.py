@@ -5,9 +5,11 @@
 PWM을 통한 진동 강도 조절과 패턴 재생을 지원합니다.
 """
 
+import threading
 import time
-from typing import Dict, List
+from typing import Dict, List, Union
 import logging
+import numpy as np
 
 try:
     import lgpio
@@ -17,9 +19,91 @@ except (ImportError, RuntimeError):
     GPIO_AVAILABLE = False
     logging.warning("lgpio를 사용할 수 없습니다. 시뮬레이션 모드로 동작합니다.")
 
+# Numba JIT (선택 사항, 설치: pip install numba)
+try:
+    import numba
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 진동 패턴 배열 형식: 단계별 (강도 %, 시간 초)
+PATTERN_DTYPE = np.dtype([("intensity", "f4"), ("duration", "f4")])
+
+
+def _as_pattern_array(pattern: Union[List[Dict], np.ndarray]) -> np.ndarray:
+    """
+    진동 패턴을 PATTERN_DTYPE 구조화 배열로 변환합니다 (이미 배열이면 그대로 반환).
+
+    Args:
+        pattern: 딕셔너리 리스트 또는 PATTERN_DTYPE 배열
+            (딕셔너리 기본값: intensity 0, duration 0.1)
+
+    Returns:
+        PATTERN_DTYPE 배열
+    """
+    if isinstance(pattern, np.ndarray) and pattern.dtype == PATTERN_DTYPE:
+        return pattern
+    return np.array(
+        [(step.get("intensity", 0), step.get("duration", 0.1)) for step in pattern],
+        dtype=PATTERN_DTYPE,
+    )
+
+
+def _jit_kernel(func):
+    """
+    스케줄 계산 커널을 Numba로 컴파일합니다 (Numba가 없거나 실패하면 원래 함수 사용).
+    """
+    if not NUMBA_AVAILABLE:
+        return func
+
+    try:
+        return numba.njit(cache=True)(func)
+    except Exception as e:
+        logger.debug(f"Numba 커널 컴파일 실패 ({func.__name__}): {e}")
+        return func
+
+
+@_jit_kernel
+def _pattern_timeline(intensities, durations):
+    """
+    패턴 단계별 강도(0~100으로 제한)와 패턴 시작 기준 종료 시각(누적 합, 초)을 계산합니다.
+
+    강도가 같은 연속 단계는 하나로 합쳐 PWM 쓰기를 한 번만 하도록 합니다.
+    GPIO 호출과 sleep은 Python에서 해야 하므로, 재생 루프에서는 이 결과를
+    순서대로 꺼내 쓰기만 합니다.
+    """
+    n = len(intensities)
+    levels = np.empty(n, np.float64)
+    ends = np.empty(n, np.float64)
+    m = 0
+    acc = 0.0
+    for i in range(n):
+        level = min(max(float(intensities[i]), 0.0), 100.0)
+        acc += float(durations[i])
+        if m > 0 and levels[m - 1] == level:
+            ends[m - 1] = acc
+        else:
+            levels[m] = level
+            ends[m] = acc
+            m += 1
+    return levels[:m], ends[:m]
+
+
+def _sleep_until(deadline: float):
+    """
+    time.monotonic() 기준 절대 시각까지 대기합니다.
+
+    단계마다 상대 시간만큼 sleep하면 GPIO 호출과 로깅에 걸린 시간이 누적되므로,
+    패턴 시작 시각에서 계산한 절대 시각에 맞춰 기다립니다.
+    """
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
 
 class VibrationMotor:
     """
@@ -70,12 +154,13 @@ class VibrationMotor:
             logger.error(f"GPIO 초기화 실패: {e}")
             raise
 
-    def set_intensity(self, intensity: float) -> bool:
+    def set_intensity(self, intensity: float, log: bool = True) -> bool:
         """
         진동 강도를 설정합니다.
 
         Args:
             intensity: 진동 강도 (0.0 ~ 100.0 %)
+            log: 모터별 로그 출력 여부 (여러 모터를 한 번에 설정할 때는 False)
 
         Returns:
             설정 성공 여부
@@ -83,17 +168,22 @@ class VibrationMotor:
         # 강도 범위 제한
         intensity = max(0.0, min(100.0, intensity))
 
-        if not self.simulation_mode and self.handle is not None:
-            # lgpio에서 duty cycle 설정
+        # duty cycle이 바뀔 때만 lgpio 호출 (매 프레임 같은 강도를 다시 쓰지 않음)
+        if (
+            not self.simulation_mode
+            and self.handle is not None
+            and intensity != self.current_intensity
+        ):
             lgpio.tx_pwm(self.handle, self.pin, self.pwm_frequency, intensity)
 
         self.current_intensity = intensity
         self.is_running = intensity > 0
 
-        if self.simulation_mode:
-            logger.info(f"[SIM] 진동 강도: {intensity:.1f}%")
-        else:
-            logger.debug(f"진동 강도: {intensity:.1f}%")
+        if log:
+            if self.simulation_mode:
+                logger.info(f"[SIM] 진동 강도: {intensity:.1f}%")
+            else:
+                logger.debug(f"진동 강도: {intensity:.1f}%")
 
         return True
 
@@ -124,27 +214,27 @@ class VibrationMotor:
         time.sleep(duration)
         self.stop()
 
-    def vibrate_pattern(self, pattern: List[Dict]):
+    def vibrate_pattern(self, pattern: Union[List[Dict], np.ndarray]):
         """
         진동 패턴을 재생합니다.
 
         Args:
-            pattern: 진동 패턴 리스트
+            pattern: 진동 패턴 리스트 또는 PATTERN_DTYPE 배열
                 예: [
                     {'intensity': 100, 'duration': 0.2},
                     {'intensity': 0, 'duration': 0.1},
                     {'intensity': 50, 'duration': 0.3}
                 ]
         """
-        logger.info(f"진동 패턴 재생 시작 ({len(pattern)}단계)")
-
-        for i, step in enumerate(pattern):
-            intensity = step.get("intensity", 0)
-            duration = step.get("duration", 0.1)
+        steps = _as_pattern_array(pattern)
+        logger.info(f"진동 패턴 재생 시작 ({len(steps)}단계)")
 
-            logger.debug(f"  단계 {i + 1}: {intensity}% for {duration}s")
+        levels, ends = _pattern_timeline(steps["intensity"], steps["duration"])
+        t0 = time.monotonic()
+        for i, (intensity, end) in enumerate(zip(levels.tolist(), ends.tolist())):
+            logger.debug(f"  단계 {i + 1}: {intensity}% until {end:.3f}s")
             self.set_intensity(intensity)
-            time.sleep(duration)
+            _sleep_until(t0 + end)
 
         self.stop()
         logger.info("진동 패턴 재생 완료")
@@ -162,13 +252,8 @@ class VibrationMotor:
         """
         logger.info(f"페이드 인 시작 (목표: {max_intensity}%, {duration}초)")
 
-        step_delay = duration / steps
-        intensity_increment = max_intensity / steps
-
-        for i in range(steps + 1):
-            intensity = intensity_increment * i
-            self.set_intensity(intensity)
-            time.sleep(step_delay)
+        # 끝값이 정확히 max_intensity가 되도록 강도 램프를 한 번에 계산
+        self._run_ramp(np.linspace(0.0, max_intensity, steps + 1), duration / steps)
 
     def fade_out(self, duration: float = 1.0, steps: int = 20):
         """
@@ -181,13 +266,15 @@ class VibrationMotor:
         start_intensity = self.current_intensity
         logger.info(f"페이드 아웃 시작 ({start_intensity}% → 0%, {duration}초)")
 
-        step_delay = duration / steps
-        intensity_decrement = start_intensity / steps
+        self._run_ramp(np.linspace(start_intensity, 0.0, steps + 1), duration / steps)
 
-        for i in range(steps + 1):
-            intensity = start_intensity - (intensity_decrement * i)
+    def _run_ramp(self, ramp: np.ndarray, step_delay: float):
+        """강도 램프를 step_delay 간격의 절대 시각에 맞춰 재생합니다."""
+        levels, ends = _pattern_timeline(ramp, np.full(len(ramp), step_delay))
+        t0 = time.monotonic()
+        for intensity, end in zip(levels.tolist(), ends.tolist()):
             self.set_intensity(intensity)
-            time.sleep(step_delay)
+            _sleep_until(t0 + end)
 
     def get_intensity(self) -> float:
         """
@@ -271,6 +358,10 @@ class VibrationMotorController:
                 pin=pin, pwm_frequency=pwm_frequency, simulation_mode=simulation_mode
             )
 
+        # pulse_parallel 정지 타이머가 이후 단계의 진동을 끄지 않도록 모터별 세대 번호로 구분
+        self._pulse_tokens: Dict[str, int] = {name: 0 for name in self.motors}
+        self._pulse_lock = threading.Lock()
+
         logger.info(f"VibrationMotorController 초기화 완료 ({len(self.motors)}개 모터)")
 
     def set_intensity(self, motor_name: str, intensity: float) -> bool:
@@ -294,12 +385,19 @@ class VibrationMotorController:
         """
         모든 모터의 진동 강도를 동시에 설정합니다.
 
+        lgpio에는 여러 핀의 PWM을 한 번에 바꾸는 호출이 없으므로, 강도가 실제로
+        바뀌는 모터에만 PWM을 씁니다. 모터별 로그는 생략하고 한 줄만 출력합니다.
+
         Args:
             intensity: 진동 강도 (0.0 ~ 100.0 %)
         """
+        self._set_all(intensity)
+        logger.info(f"모든 모터 강도 설정: {max(0.0, min(100.0, intensity))}%")
+
+    def _set_all(self, intensity: float):
+        """로그 없이 모든 모터의 강도를 설정합니다."""
         for motor in self.motors.values():
-            motor.set_intensity(intensity)
-        logger.info(f"모든 모터 강도 설정: {intensity}%")
+            motor.set_intensity(intensity, log=False)
 
     def start(self, motor_name: str, intensity: float = 100.0) -> bool:
         """
@@ -344,8 +442,7 @@ class VibrationMotorController:
 
     def stop_all(self):
         """모든 모터를 정지합니다."""
-        for motor in self.motors.values():
-            motor.stop()
+        self._set_all(0)
         logger.info("모든 모터 정지")
 
     def pulse(self, motor_name: str, intensity: float, duration: float) -> bool:
@@ -371,48 +468,140 @@ class VibrationMotorController:
         """
         여러 모터를 순차적으로 진동시킵니다.
 
+        각 단계는 이전 단계가 끝나는 시각에 시작합니다. 'start_time'(초)을 지정한
+        단계는 그 시각에 시작하므로 다른 모터의 진동과 겹칠 수 있습니다.
+
         Args:
             sequence: 진동 시퀀스
                 예: [
                     {'motor': 'left', 'intensity': 100, 'duration': 0.2},
                     {'motor': 'right', 'intensity': 100, 'duration': 0.2},
+                    {'motor': 'top', 'intensity': 50, 'duration': 0.3, 'start_time': 0.3},
                 ]
         """
         logger.info(f"시퀀스 재생 시작 ({len(sequence)}단계)")
 
-        for i, step in enumerate(sequence):
-            motor_name = step.get("motor")
-            intensity = step.get("intensity", 100)
+        steps = []
+        offset = 0.0
+        for step in sequence:
             duration = step.get("duration", 0.1)
+            start_time = step.get("start_time", offset)
+            steps.append({**step, "duration": duration, "start_time": start_time})
+            offset = start_time + duration
+
+        self.pulse_parallel(steps)
+        logger.info("시퀀스 재생 완료")
 
-            if motor_name in self.motors:
-                logger.debug(
-                    f"  단계 {i + 1}: {motor_name} {intensity}% for {duration}s"
+    def pulse_parallel(self, steps: List[Dict]):
+        """
+        여러 모터를 지정된 시작 시각에 맞춰 동시에 진동시킵니다.
+
+        호출한 스레드는 시작 시각마다 강도만 설정하고, 정지는 threading.Timer가
+        처리하므로 모터끼리 서로를 기다리지 않습니다. 모든 진동이 끝날 때까지 반환하지 않습니다.
+
+        Args:
+            steps: 진동 단계 리스트
+                예: [
+                    {'motor': 'left', 'intensity': 100, 'duration': 0.3, 'start_time': 0.0},
+                    {'motor': 'right', 'intensity': 100, 'duration': 0.3, 'start_time': 0.1},
+                ]
+        """
+        # 시작 시각 순으로 정렬 (같은 시각이면 입력 순서 유지)
+        schedule = sorted(
+            [
+                (
+                    step.get("start_time", 0.0),
+                    step.get("motor"),
+                    step.get("intensity", 100),
+                    step.get("duration", 0.1),
                 )
-                self.motors[motor_name].pulse(intensity, duration)
-            else:
+                for step in steps
+            ],
+            key=lambda item: item[0],
+        )
+        schedule = self._coalesce_schedule(schedule)
+
+        timers = []
+        t0 = time.monotonic()
+        for i, (start_time, motor_name, intensity, duration) in enumerate(schedule):
+            if motor_name not in self.motors:
                 logger.warning(
                     f"  단계 {i + 1}: 모터 '{motor_name}'을 찾을 수 없습니다."
                 )
+                continue
 
-        logger.info("시퀀스 재생 완료")
+            _sleep_until(t0 + start_time)
+
+            logger.debug(
+                f"  단계 {i + 1}: {motor_name} {intensity}% for {duration}s (t={start_time}s)"
+            )
+            with self._pulse_lock:
+                self._pulse_tokens[motor_name] += 1
+                token = self._pulse_tokens[motor_name]
+            self.motors[motor_name].set_intensity(intensity)
+
+            timer = threading.Timer(
+                max(0.0, t0 + start_time + duration - time.monotonic()),
+                self._end_pulse,
+                args=(motor_name, token),
+            )
+            timer.daemon = True
+            timer.start()
+            timers.append(timer)
 
-    def vibrate_pattern_all(self, pattern: List[Dict]):
+        for timer in timers:
+            timer.join()
+
+    @staticmethod
+    def _coalesce_schedule(schedule: List[tuple]) -> List[tuple]:
         """
-        모든 모터에 동일한 패턴을 동기화하여 재생합니다.
+        같은 모터에서 이전 단계가 끝나는 시각에 같은 강도로 이어지는 단계를 합칩니다.
 
         Args:
-            pattern: 진동 패턴
+            schedule: 시작 시각 순으로 정렬된 (start_time, motor, intensity, duration) 리스트
+
+        Returns:
+            합쳐진 스케줄 (시작 시각 순서 유지)
+        """
+        merged = []
+        last = {}  # 모터별 마지막 단계의 merged 인덱스
+        for start_time, motor_name, intensity, duration in schedule:
+            i = last.get(motor_name)
+            if i is not None:
+                prev_start, _, prev_intensity, prev_duration = merged[i]
+                if (
+                    prev_intensity == intensity
+                    and abs(prev_start + prev_duration - start_time) < 1e-6
+                ):
+                    merged[i] = (prev_start, motor_name, intensity, prev_duration + duration)
+                    continue
+            last[motor_name] = len(merged)
+            merged.append((start_time, motor_name, intensity, duration))
+        return merged
+
+    def _end_pulse(self, motor_name: str, token: int):
+        """pulse_parallel 정지 타이머 콜백 (그 사이 같은 모터에 새 단계가 시작됐으면 무시)"""
+        with self._pulse_lock:
+            if self._pulse_tokens[motor_name] != token:
+                return
+        self.motors[motor_name].set_intensity(0)
+
+    def vibrate_pattern_all(self, pattern: Union[List[Dict], np.ndarray]):
         """
-        logger.info(f"동기화 패턴 재생 시작 ({len(pattern)}단계)")
+        모든 모터에 동일한 패턴을 동기화하여 재생합니다.
 
-        for i, step in enumerate(pattern):
-            intensity = step.get("intensity", 0)
-            duration = step.get("duration", 0.1)
+        Args:
+            pattern: 진동 패턴 (리스트 또는 PATTERN_DTYPE 배열)
+        """
+        steps = _as_pattern_array(pattern)
+        logger.info(f"동기화 패턴 재생 시작 ({len(steps)}단계)")
 
-            logger.debug(f"  단계 {i + 1}: 모든 모터 {intensity}% for {duration}s")
+        levels, ends = _pattern_timeline(steps["intensity"], steps["duration"])
+        t0 = time.monotonic()
+        for i, (intensity, end) in enumerate(zip(levels.tolist(), ends.tolist())):
+            logger.debug(f"  단계 {i + 1}: 모든 모터 {intensity}% until {end:.3f}s")
             self.set_all_intensity(intensity)
-            time.sleep(duration)
+            _sleep_until(t0 + end)
 
         self.stop_all()
         logger.info("동기화 패턴 재생 완료")
@@ -450,7 +639,7 @@ class VibrationMotorController:
 
 
 # 미리 정의된 진동 패턴
-VIBRATION_PATTERNS = {
+_RAW_PATTERNS = {
     "short_pulse": [{"intensity": 100, "duration": 0.1}],
     "double_pulse": [
         {"intensity": 100, "duration": 0.1},
@@ -507,3 +696,8 @@ VIBRATION_PATTERNS = {
         {"intensity": 100, "duration": 0.1},
     ],
 }
+
+# import 시점에 구조화 배열로 변환 (재생할 때 딕셔너리 조회 없음)
+VIBRATION_PATTERNS = {
+    name: _as_pattern_array(pattern) for name, pattern in _RAW_PATTERNS.items()
+}